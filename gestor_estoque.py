@@ -24,14 +24,21 @@
 
 # Bibliotecas padrão do Python
 import datetime
+import html
+import itertools
+import json
 import os
+import pathlib
+import re
+import stat
+import threading
 import webbrowser
 import sys
 
-# Bibliotecas de terceiros (necessário instalar: pip install gspread pandas oauth2client)
-import gspread
-import pandas as pd
-from oauth2client.service_account import ServiceAccountCredentials
+# Bibliotecas de terceiros (necessário instalar: pip install gspread pandas oauth2client; o numpy vem com o pandas)
+# Elas demoram a carregar (principalmente no executável), então só são importadas por _importar_bibliotecas(),
+# depois que a janela já apareceu. Até lá, os nomes ficam definidos como None.
+gspread = np = pd = AuthorizedSession = ServiceAccountCredentials = None
 
 # Biblioteca para a interface gráfica (GUI)
 import tkinter as tk
@@ -41,6 +48,158 @@ from tkinter import ttk, messagebox, scrolledtext, filedialog
 # Define o nome da planilha do Google Sheets que o programa irá acessar.
 NOME_PLANILHA = "ControleDeEstoqueTI"
 
+# Pasta (dentro da pasta de cache do usuário, ver _pasta_cache_usuario) onde fica a cópia local dos dados da planilha.
+NOME_PASTA_CACHE = "hexastock_cache"
+
+# Colunas lidas de cada aba de dados: exatamente as colunas que o programa grava (na mesma ordem das listas
+# montadas em add/edit/registrar), para não baixar anotações ou colunas extras que existam ao lado.
+COLUNAS_ABAS = {"equipamentos": "A:I", "movimentacoes": "A:J", "movimentacoes_setores": "A:L"}
+
+# Validação dos campos de quantidade: um número inteiro (só dígitos ASCII, sinal opcional, espaços nas pontas).
+# O sinal é aceito aqui para que valores negativos recebam a mensagem própria de "não podem ser negativas".
+_INT_RE = re.compile(r'\s*[-+]?\d+\s*', re.ASCII)
+
+# Marcadores dos templates de relatório, ex.: {{data_geracao}}. Com o grupo, re.split devolve os
+# trechos de texto fixo intercalados com os nomes dos marcadores (nas posições ímpares).
+_PLACEHOLDER_RE = re.compile(r'\{\{(\w+)\}\}')
+
+# Placeholder dos campos de data das janelas de relatório, mostrando o formato esperado.
+PLACEHOLDER_DATA = "dd/mm/aaaa"
+COR_PLACEHOLDER = "grey"
+
+def _pasta_cache_usuario():
+    """
+    Retorna a pasta da cópia local dos dados dentro da pasta de cache do usuário atual, e não no
+    diretório temporário compartilhado do sistema: %LOCALAPPDATA% no Windows e $XDG_CACHE_HOME
+    (ou ~/.cache) nos demais sistemas.
+
+    Returns:
+        str: O caminho da pasta (que pode ainda não existir).
+    """
+    if os.name == 'nt': base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    else: base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, NOME_PASTA_CACHE)
+
+def _dividir_template(texto):
+    """
+    Divide um template nos marcadores {{...}}, já codificando os trechos fixos em UTF-8.
+
+    Args:
+        texto (str): O conteúdo do template.
+
+    Returns:
+        list: Os trechos fixos (bytes) intercalados com os nomes dos marcadores (str, posições ímpares).
+    """
+    partes = _PLACEHOLDER_RE.split(texto)
+    partes[::2] = [parte.encode('utf-8') for parte in partes[::2]]
+    return partes
+
+# Intervalo da sincronização automática com a planilha (em milissegundos), que traz as alterações
+# feitas por outros usuários e confirma os registros que foram aplicados apenas localmente.
+INTERVALO_SINCRONIZACAO_MS = 5 * 60 * 1000
+
+# Quantidade de linhas inseridas de cada vez nas tabelas de equipamentos e do histórico entre setores.
+# As demais só entram na tabela quando o usuário rola até perto do fim.
+LOTE_LINHAS_TABELA = 200
+
+# Colunas do relatório de movimentações entre setores, na ordem da tabela, com os nomes usados nos cabeçalhos.
+COLUNAS_RELATORIO_SETORES = {'data_movimentacao': 'Data', 'tipo_equipamento': 'Equipamento', 'patrimonio': 'Patrimônio', 'servicetag': 'ServiceTag',
+                             'setor_origem': 'Origem', 'setor_destino': 'Destino', 'responsavel': 'Responsável', 'chamado': 'Chamado',
+                             'solicitante': 'Solicitante', 'status_regularizacao': 'Status', 'observacao': 'Observação'}
+
+# Colunas que podem faltar nas abas de movimentações, com o valor usado quando não existem.
+COLUNAS_OPCIONAIS_MOV = {'motivo_laudo': ''}
+COLUNAS_OPCIONAIS_MOV_SETORES = {'chamado': '', 'solicitante': '', 'status_regularizacao': 'Pendente'}
+
+# Colunas do histórico exibidas em cada tabela do relatório HTML, na ordem dos cabeçalhos.
+COLUNAS_HISTORICO_RELATORIO = ['data_movimentacao', 'tipo_movimentacao', 'quantidade_movida', 'responsavel_movimentacao',
+                               'solicitante', 'destino_origem', 'chamado', 'motivo_laudo']
+
+def _importar_bibliotecas():
+
+    """Importa as bibliotecas de terceiros e as deixa disponíveis com os nomes globais do módulo."""
+
+    global gspread, np, pd, AuthorizedSession, ServiceAccountCredentials
+    import gspread
+    import numpy as np
+    import pandas as pd
+    from google.auth.transport.requests import AuthorizedSession # Vem junto com o gspread (google-auth).
+    from oauth2client.service_account import ServiceAccountCredentials
+
+def _escapar_com_quebras(texto):
+    """
+    Escapa um texto para HTML e converte suas quebras de linha em <br> (ex: os patrimônios de um "Kit").
+
+    Args:
+        texto (str): O texto vindo da planilha.
+
+    Returns:
+        str: O texto pronto para ser inserido no HTML.
+    """
+    return html.escape(texto).replace('\n', '<br>')
+
+_EPOCA = datetime.date(1970, 1, 1)
+_NS_POR_DIA = 86_400 * 10**9
+
+def _data_ddmmaaaa(texto):
+    """
+    Converte uma data digitada no formato dd/mm/aaaa, fatiando a string em vez de usar strptime.
+
+    Args:
+        texto (str): A data digitada pelo usuário.
+
+    Returns:
+        datetime.date: A data correspondente. Lança ValueError se o texto não for uma data válida.
+    """
+    texto = texto.strip()
+    if len(texto) == 10 and texto[2] == '/' and texto[5] == '/':
+        return datetime.date(int(texto[6:10]), int(texto[3:5]), int(texto[0:2]))
+    # Formatos sem zero à esquerda (ex: 1/2/2024) seguem pelo caminho tradicional.
+    return datetime.datetime.strptime(texto, '%d/%m/%Y').date()
+
+def _intervalo_datas_ns(data_inicio_str, data_fim_str):
+    """
+    Calcula os limites de um filtro de datas como int64 em nanossegundos, o formato de '_datas_ns'.
+
+    Args:
+        data_inicio_str (str): A data inicial (dd/mm/aaaa).
+        data_fim_str (str): A data final (dd/mm/aaaa), incluída por inteiro no intervalo.
+
+    Returns:
+        tuple: (inicio_ns, fim_ns). Lança ValueError se alguma das datas for inválida.
+    """
+    inicio_ns = (_data_ddmmaaaa(data_inicio_str) - _EPOCA).days * _NS_POR_DIA
+    # O fim vai até o último segundo do dia final.
+    fim_ns = ((_data_ddmmaaaa(data_fim_str) - _EPOCA).days + 1) * _NS_POR_DIA - 10**9
+    return inicio_ns, fim_ns
+
+def _estatisticas_dashboard(quantidade, estoque_minimo, ativo, datas_mov_ns, inicio_mes_ns, fim_mes_ns):
+    
+    """
+    Calcula os números do dashboard diretamente sobre arrays do NumPy, sem passar pelo Pandas.
+
+    Args:
+        quantidade (np.ndarray): Quantidade atual de cada item.
+        estoque_minimo (np.ndarray): Estoque mínimo de cada item.
+        ativo (np.ndarray): Máscara booleana dos itens que não foram descartados.
+        datas_mov_ns (np.ndarray): Data de cada movimentação em nanossegundos (int64). NaT vira o menor int64.
+        inicio_mes_ns (int): Início do mês atual, em nanossegundos.
+        fim_mes_ns (int): Início do mês seguinte, em nanossegundos.
+
+    Returns:
+        tuple: (total de unidades, tipos de itens, itens com estoque baixo, movimentações no mês).
+    """
+    
+    # Todos os números de equipamentos saem da mesma máscara, sem montar um DataFrame filtrado.
+    # O 'where=' aplica a máscara dentro da própria operação, sem criar cópias filtradas dos arrays.
+    total_unidades = int(np.sum(quantidade, where=ativo))
+    tipos_unicos = int(np.count_nonzero(ativo))
+    baixo = np.zeros(quantidade.shape, dtype=bool); np.less_equal(quantidade, estoque_minimo, out=baixo, where=ativo)
+    estoque_baixo = int(np.count_nonzero(baixo))
+    mov_mes = int(np.count_nonzero((datas_mov_ns >= inicio_mes_ns) & (datas_mov_ns < fim_mes_ns)))
+    return total_unidades, tipos_unicos, estoque_baixo, mov_mes
+
+
 class App(tk.Tk):
     
     """ Classe principal da aplicação. Herda de tk.Tk para criar a janela principal.
@@ -48,6 +207,57 @@ class App(tk.Tk):
     planilha do Google."""
     
 
+    def _carregar_template(self, caminho):
+        """
+        Lê um template de relatório e o guarda já dividido nos marcadores {{...}}.
+        O arquivo só é lido de novo se tiver sido modificado desde a última leitura.
+
+        Args:
+            caminho (str): O caminho do arquivo de template.
+
+        Returns:
+            list: Os trechos de texto fixo intercalados com os nomes dos marcadores (posições ímpares).
+
+        Raises:
+            FileNotFoundError: Se o arquivo não existir.
+        """
+        modificado = os.stat(caminho).st_mtime_ns
+        em_cache = self._templates.get(caminho)
+        if em_cache is None or em_cache[0] != modificado:
+            with open(caminho, 'r', encoding='utf-8') as f: em_cache = (modificado, _dividir_template(f.read()))
+            self._templates[caminho] = em_cache
+        return em_cache[1]
+
+    @staticmethod
+    def _gravar_template(caminho, partes, valores):
+        """
+        Grava o relatório preenchendo o template direto no arquivo (em modo binário), sem montar
+        antes o HTML inteiro em uma única string. A escrita vai para um arquivo temporário ao lado
+        do destino, que só substitui o arquivo final (os.replace) depois de completo.
+
+        Args:
+            caminho (str): O arquivo de destino escolhido pelo usuário.
+            partes (list): O template dividido por _dividir_template (trechos fixos já em bytes).
+            valores (dict): O conteúdo de cada marcador: um texto, uma lista de trechos já prontos
+                (unida e codificada de uma vez) ou um gerador de trechos (gravados conforme são produzidos).
+                Marcadores sem valor ficam como estão.
+        """
+        temporario = caminho + '.tmp'
+        try:
+            # O buffer de 1 MiB junta os muitos trechos pequenos em poucas escritas no disco.
+            with open(temporario, 'wb', buffering=1 << 20) as f:
+                for i, parte in enumerate(partes):
+                    if not i % 2: f.write(parte); continue
+                    valor = valores.get(parte, '{{' + parte + '}}')
+                    if isinstance(valor, str): f.write(valor.encode('utf-8'))
+                    elif isinstance(valor, (list, tuple)): f.write(''.join(valor).encode('utf-8'))
+                    else: f.writelines(trecho.encode('utf-8') for trecho in valor)
+            os.replace(temporario, caminho)
+        except BaseException:
+            try: os.remove(temporario)
+            except OSError: pass
+            raise
+
     def resource_path(self, relative_path):
         """ Retorna o caminho absoluto para um recurso (ex: arquivo de template).
         Esta função é crucial para que o PyInstaller encontre os arquivos
@@ -72,6 +282,20 @@ class App(tk.Tk):
         self.geometry("1250x900")
         self.configure(bg="#F4F6F8")
         
+        # Pasta da cópia local dos dados, reaproveitada enquanto a planilha não for modificada.
+        self._cache_dir = _pasta_cache_usuario()
+        self._refresh_em_andamento = False # Evita duas atualizações em segundo plano ao mesmo tempo.
+        self._refresh_manual_pendente = False # Clique em "Atualizar Dados" aguardando a busca (cursor de espera).
+        self._gravacao_em_andamento = False # Evita enviar a mesma gravação duas vezes (cliques repetidos).
+        self._datas_convertidas = {} # {texto da data: Timestamp}, reaproveitado entre as atualizações.
+        self._versao_dados = 0 # Incrementada a cada escrita; descarta sincronizações iniciadas antes dela.
+        self._templates = {} # {caminho do template: (data de modificação, trechos já divididos)}.
+        
+        # Desenha a janela com um aviso antes de carregar as bibliotecas e conectar, para ela aparecer logo.
+        aviso_carregando = ttk.Label(self, text="Conectando à planilha...", font=("Roboto", 14)); aviso_carregando.pack(expand=True)
+        self.update()
+        _importar_bibliotecas()
+
                 # --- Conexão e Carregamento de Dados ---
         # Tenta conectar com o Google Sheets. Se falhar, a aplicação é encerrada.
         
@@ -85,10 +309,11 @@ class App(tk.Tk):
         # Define um estilo visual para os componentes da interface.
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
+        self._init_styles() # Estilos compartilhados por todas as abas, configurados uma única vez.
         
-        # Cria o container principal com abas (Notebook).
+        # Cria o container principal com abas (Notebook). Ele só é posicionado na janela no fim,
+        # depois de montadas e preenchidas as abas, para o layout ser calculado uma única vez.
         self.notebook = ttk.Notebook(self)
-        self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
         
         # Cria os frames (páginas) para cada aba.
         self.estoque_tab = ttk.Frame(self.notebook, padding="10")
@@ -104,10 +329,15 @@ class App(tk.Tk):
         
         self.refresh_all_data()
 
-    def criar_aba_estoque(self):
-        
-        """Cria e organiza todos os widgets da aba 'Estoque da Informática'."""
-        
+        # Troca o aviso de carregamento pela interface completa.
+        aviso_carregando.destroy()
+        self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
+        self.after(INTERVALO_SINCRONIZACAO_MS, self._sincronizacao_periodica)
+
+    def _init_styles(self):
+
+        """Configura os estilos ttk usados pelas abas; deve ser chamado antes de criar os widgets."""
+
         self.style.configure("TLabel", background="#F4F6F8", font=("Roboto", 11))
         self.style.configure("TEntry", font=("Roboto", 11))
         self.style.configure("TButton", font=("Roboto", 10, "bold"), padding=5)
@@ -120,7 +350,13 @@ class App(tk.Tk):
         self.style.configure("CardText.TLabel", font=("Roboto", 10), background="white")
         self.style.configure("Multiline.Treeview", rowheight=65, font=("Roboto", 10))
         self.style.configure("Multiline.Treeview.Heading", font=("Roboto", 10, "bold"))
+        self.style.configure("Pendente.Treeview", background="#FFFACD") # Amarelo claro
+        self.style.configure("Regularizado.Treeview", background="#64FF88") # Verde claro
 
+    def criar_aba_estoque(self):
+        
+        """Cria e organiza todos os widgets da aba 'Estoque da Informática'."""
+        
         # --- Seção Dashboard (Cards) ---
         dashboard_frame = ttk.LabelFrame(self.estoque_tab, text="Dashboard", padding="10"); dashboard_frame.pack(fill='x', padx=10, pady=10)
         self.total_itens_var = tk.StringVar(value="..."); self.tipos_unicos_var = tk.StringVar(value="..."); self.estoque_baixo_var = tk.StringVar(value="..."); self.mov_mes_var = tk.StringVar(value="...")
@@ -148,8 +384,9 @@ class App(tk.Tk):
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=50)
         search_entry.pack(side="left", fill="x", expand=True, padx=5)
         
-        # O evento "<KeyRelease>" chama a função de filtro a cada tecla pressionada.
-        search_entry.bind("<KeyRelease>", self.filtrar_equipamentos)
+        # O evento "<KeyRelease>" agenda a função de filtro; teclas digitadas em sequência são agrupadas.
+        self._filter_after_id = None; self._ultimo_termo_busca = '' # Último termo aplicado na tabela.
+        search_entry.bind("<KeyRelease>", self._on_search_key)
         
         refresh_button = ttk.Button(general_actions_frame, text="🔄 Atualizar Dados", command=self.refresh_with_feedback, width=20)
         refresh_button.pack(side="right", padx=10, ipady=8)
@@ -157,6 +394,7 @@ class App(tk.Tk):
         # --- Seção do Formulário de Cadastro ---
         form_frame = ttk.Frame(self.estoque_tab, padding="20 10 20 20"); form_frame.pack(fill='x', padx=10, pady=10)
         ttk.Label(form_frame, text="Nome do Equipamento:").grid(row=0, column=0, padx=5, pady=5, sticky="w"); self.entry_nome = ttk.Entry(form_frame, width=30); self.entry_nome.grid(row=0, column=1, padx=5, pady=5)
+        self._cor_texto_padrao = self.entry_nome.cget("foreground") # Cor normal do texto dos campos, usada ao limpar os placeholders.
         ttk.Label(form_frame, text="Nº de Série/SKU (Opcional):").grid(row=1, column=0, padx=5, pady=5, sticky="w"); self.entry_serie = ttk.Entry(form_frame, width=30); self.entry_serie.grid(row=1, column=1, padx=5, pady=5)
         ttk.Label(form_frame, text="Descrição:").grid(row=0, column=2, padx=15, pady=5, sticky="w"); self.entry_descricao = ttk.Entry(form_frame, width=30); self.entry_descricao.grid(row=0, column=3, padx=5, pady=5)
         ttk.Label(form_frame, text="Quantidade Inicial:").grid(row=1, column=2, padx=15, pady=5, sticky="w"); self.entry_quantidade = ttk.Entry(form_frame, width=10); self.entry_quantidade.grid(row=1, column=3, padx=5, pady=5, sticky="w"); self.entry_quantidade.insert(0, "1")
@@ -193,8 +431,10 @@ class App(tk.Tk):
         self.tree.column("ID", width=40, anchor="center"); self.tree.column("Nome", width=250); self.tree.column("Nº Série", width=150); self.tree.column("Categoria", width=120); self.tree.column("Descrição", width=300); self.tree.column("Qtd.", width=60, anchor="center"); self.tree.column("Status", width=100, anchor="center")
         self.tree.pack(fill='both', expand=True, side='left')
          
-        # Adiciona uma barra de rolagem vertical.
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview); scrollbar.pack(side='right', fill='y'); self.tree.configure(yscrollcommand=scrollbar.set)
+        # Adiciona uma barra de rolagem vertical; a rolagem também é usada para carregar mais linhas.
+        self.tree_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview); self.tree_scrollbar.pack(side='right', fill='y'); self.tree.configure(yscrollcommand=self._on_equip_scroll)
+        # Todas as linhas da tabela (já filtradas e ordenadas) e quantas delas já foram inseridas.
+        self._equip_linhas = []; self._equip_exibidas = 0
         
         # Associa o evento de duplo clique na tabela à função de ver histórico.
         self.tree.bind("<Double-1>", self.abrir_janela_historico)
@@ -236,9 +476,6 @@ class App(tk.Tk):
         ttk.Label(common_fields_frame, text="Responsável (seu nome):").grid(row=2, column=0, padx=5, pady=5, sticky="w"); self.mov_entry_responsavel = ttk.Entry(common_fields_frame, width=30); self.mov_entry_responsavel.grid(row=2, column=1, padx=5, pady=5, sticky="w")
         ttk.Label(common_fields_frame, text="Observação:").grid(row=3, column=0, padx=5, pady=5, sticky="nw"); self.mov_text_obs = tk.Text(common_fields_frame, width=80, height=3, font=("Roboto", 10)); self.mov_text_obs.grid(row=3, column=1, columnspan=3, padx=5, pady=5, sticky="w")
         
-        self.style.configure("Pendente.Treeview", background="#FFFACD") # Amarelo claro
-        self.style.configure("Regularizado.Treeview", background="#64FF88") # Verde claro
-
         form_mov_frame = ttk.LabelFrame(self.mov_setores_tab, text="Registrar Nova Movimentação Entre Setores", padding="20")
         
         # --- Seção de Botões de Ação da Movimentação ---
@@ -278,7 +515,20 @@ class App(tk.Tk):
         # Configuração dos cabeçalhos e colunas.
         self.mov_setores_tree.heading("ID", text="ID"); self.mov_setores_tree.heading("Data", text="Data"); self.mov_setores_tree.heading("Status", text="Status"); self.mov_setores_tree.heading("Equipamento", text="Equipamento"); self.mov_setores_tree.heading("Patrimônio", text="Patrimônio"); self.mov_setores_tree.heading("ServiceTag", text="ServiceTag"); self.mov_setores_tree.heading("Origem", text="Origem"); self.mov_setores_tree.heading("Destino", text="Destino"); self.mov_setores_tree.heading("Responsável", text="Responsável"); self.mov_setores_tree.heading("Chamado", text="Chamado"); self.mov_setores_tree.heading("Solicitante", text="Solicitante")
         self.mov_setores_tree.column("ID", width=40, anchor="center"); self.mov_setores_tree.column("Data", width=130); self.mov_setores_tree.column("Status", width=100, anchor="center"); self.mov_setores_tree.column("Equipamento", width=180); self.mov_setores_tree.column("Patrimônio", width=120); self.mov_setores_tree.column("ServiceTag", width=120); self.mov_setores_tree.column("Origem", width=120); self.mov_setores_tree.column("Destino", width=120); self.mov_setores_tree.column("Responsável", width=110); self.mov_setores_tree.column("Chamado", width=80); self.mov_setores_tree.column("Solicitante", width=110)
-        self.mov_setores_tree.pack(fill="both", expand=True)
+        self.mov_setores_tree.pack(fill="both", expand=True, side='left')
+
+        # Barra de rolagem vertical; a rolagem também é usada para carregar mais linhas do histórico.
+        self.mov_setores_scrollbar = ttk.Scrollbar(hist_mov_frame, orient="vertical", command=self.mov_setores_tree.yview); self.mov_setores_scrollbar.pack(side='right', fill='y')
+        self.mov_setores_tree.configure(yscrollcommand=self._on_mov_setores_scroll)
+
+        # Configura as 'tags' para colorir as linhas com base no status.
+        self.mov_setores_tree.tag_configure('Pendente', background="#FAF6C8") # Amarelo claro
+        self.mov_setores_tree.tag_configure('Regularizado', background="#CFF7D1") #Verde Claro
+
+        # Guarda o que está exibido na tabela ({chave: (iid, values, tags)}) para atualizá-la só com as diferenças.
+        self._mov_row_iids = {}
+        # Todas as linhas do histórico, já ordenadas, e quantas delas estão inseridas na tabela.
+        self._mov_linhas = []; self._mov_limite_exibido = LOTE_LINHAS_TABELA
 
     # --- INÍCIO: FUNÇÕES DE LÓGICA E DADOS ---
     def conectar_google_sheets(self):
@@ -296,7 +546,11 @@ class App(tk.Tk):
             script_dir = os.path.dirname(os.path.abspath(__file__)); json_path = os.path.join(script_dir, 'credentials.json')
             
             # Autoriza o acesso usando as credenciais.
-            creds = ServiceAccountCredentials.from_json_keyfile_name(json_path, scope); client = gspread.authorize(creds)
+            # Uma única sessão HTTP é usada durante toda a execução: as conexões (e o handshake TLS) são
+            # reaproveitadas entre as chamadas, e as respostas vêm comprimidas (gzip) por padrão.
+            creds = ServiceAccountCredentials.from_json_keyfile_name(json_path, scope)
+            self.sessao_http = AuthorizedSession(gspread.utils.convert_credentials(creds))
+            client = gspread.authorize(None, session=self.sessao_http)
             
             # Abre a planilha pelo nome e obtém acesso a cada aba (worksheet).
             self.spreadsheet = client.open(NOME_PLANILHA)
@@ -317,15 +571,18 @@ class App(tk.Tk):
         """
         
         try:
-            config_records = self.config_sheet.get_all_records(); config_df = pd.DataFrame(config_records)
+            # Lê a aba como uma matriz de valores e localiza as colunas pelo cabeçalho.
+            # São poucas linhas, então um laço simples é mais leve do que montar um DataFrame.
+            rows = self.config_sheet.get_values(); header = rows[0]
+            pi = header.index('parametro'); vi = header.index('valor')
             
-            # Filtra e cria listas de valores únicos para 'destino' e 'categoria'.
-            self.lista_destinos = config_df[config_df['parametro'] == 'destino']['valor'].tolist(); self.lista_destinos.sort()
-            self.lista_categorias = config_df[config_df['parametro'] == 'categoria']['valor'].tolist(); self.lista_categorias.sort()
+            # Filtra e cria listas ordenadas de valores para 'destino' e 'categoria'.
+            self.lista_destinos = sorted(r[vi] for r in rows[1:] if r[pi] == 'destino')
+            self.lista_categorias = sorted(r[vi] for r in rows[1:] if r[pi] == 'categoria')
             
             # Pega o valor padrão para o estoque mínimo.
-            self.default_estoque_minimo = config_df[config_df['parametro'] == 'default_estoque_minimo']['valor'].iloc[0]
-        except (IndexError, KeyError, gspread.exceptions.GSpreadException) as e:
+            self.default_estoque_minimo = [r[vi] for r in rows[1:] if r[pi] == 'default_estoque_minimo'][0]
+        except (IndexError, ValueError, gspread.exceptions.GSpreadException) as e:
              messagebox.showerror("Erro de Configuração", f"A aba 'config' parece mal formatada ou vazia. Verifique os parâmetros e valores.\n\nErro: {e}"); self.destroy()
     
     def refresh_dataframes(self):
@@ -335,26 +592,374 @@ class App(tk.Tk):
         Realiza conversões de tipo para garantir que os dados numéricos e de data
         sejam tratados corretamente.
         """
-        # Pega todos os registros e cria os DataFrames.
-        self.equip_df = pd.DataFrame(self.equip_sheet.get_all_records()); self.mov_df = pd.DataFrame(self.mov_sheet.get_all_records()); self.mov_setores_df = pd.DataFrame(self.mov_setores_sheet.get_all_records())
         
-        # Faz a conversão de colunas importantes para o tipo numérico.
-        # 'errors=coerce' transforma valores inválidos em NaN, que são preenchidos com 1.
-        if not self.equip_df.empty:
-            for col in ['id', 'quantidade', 'estoque_minimo']: self.equip_df[col] = pd.to_numeric(self.equip_df[col], errors='coerce').fillna(1)
+        self._apply_dataframes(self._fetch_remote())
+
+    def _fetch_remote(self):
+
+        """
+        Faz apenas a parte de rede da atualização: busca os valores das abas de dados.
+        Não toca em widgets nem nos DataFrames, por isso pode rodar fora da thread da interface.
+
+        Returns:
+            list: Os 'valueRanges' de equipamentos, movimentações e movimentações entre setores.
+        """
+
+        # Busca as três abas em uma única requisição (values.batchGet), em vez de uma chamada por aba,
+        # limitando cada uma às colunas usadas pelo programa.
+        ranges = [f"'{sheet.title}'!{COLUNAS_ABAS[sheet.title]}" for sheet in (self.equip_sheet, self.mov_sheet, self.mov_setores_sheet)]
+        return self._get_value_ranges(ranges)
+
+    def _apply_dataframes(self, value_ranges):
+
+        """
+        Monta os DataFrames a partir dos valores baixados por _fetch_remote() e
+        faz as conversões de tipo. Deve ser chamada na thread da interface.
+
+        Args:
+            value_ranges (list): O retorno de _fetch_remote().
+        """
+
+        # Guarda os valores brutos, que servem de base para aplicar novos registros localmente.
+        self._value_ranges = value_ranges
+
+        # Cria os DataFrames a partir das matrizes de valores retornadas.
+        self.equip_df, self.mov_df, self.mov_setores_df = [self._values_to_dataframe(vr) for vr in value_ranges]
+
+        # Conversões de tipo de cada aba (as mesmas aplicadas aos registros novos, ver _aplicar_nova_linha_local).
+        self._completar_colunas_opcionais(self.mov_df, COLUNAS_OPCIONAIS_MOV)
+        self._preparar_equip_df(self.equip_df); self._preparar_mov_setores_df(self.mov_setores_df)
         if not self.mov_df.empty:
-            for col in ['id_equipamento_fk', 'id_movimentacao']: self.mov_df[col] = pd.to_numeric(self.mov_df[col], errors='coerce')
+            num_cols = ['id_equipamento_fk', 'id_movimentacao']
+            self.mov_df[num_cols] = self.mov_df[num_cols].apply(pd.to_numeric, errors='coerce')
+            # Assim como 'status' e 'categoria' dos equipamentos, o tipo da movimentação tem poucos valores distintos.
+            if 'tipo_movimentacao' in self.mov_df.columns: self.mov_df['tipo_movimentacao'] = self.mov_df['tipo_movimentacao'].astype('category')
             # Converte a coluna de data para o formato datetime do Pandas.
-            self.mov_df['data_movimentacao_dt'] = pd.to_datetime(self.mov_df['data_movimentacao'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-        if not self.mov_setores_df.empty and 'id' in self.mov_setores_df.columns:
-            self.mov_setores_df['id'] = pd.to_numeric(self.mov_setores_df['id'])
+            self.mov_df['data_movimentacao_dt'] = self._converter_datas(self.mov_df['data_movimentacao'])
+        # As mesmas datas como inteiros (nanossegundos; datas inválidas viram o menor int64), prontas para o dashboard.
+        if self.mov_df.empty: self._mov_datas_ns = np.empty(0, dtype='int64')
+        else: self._mov_datas_ns = self.mov_df['data_movimentacao_dt'].to_numpy(dtype='datetime64[ns]').view('int64')
+        self._mov_setores_datas_ns = self._datas_ns_mov_setores(self.mov_setores_df)
+
+        # Guarda as colunas dos equipamentos como arrays do NumPy (uma estrutura de arrays), lidas
+        # diretamente pelo dashboard, pela busca e pela tabela, sem passar pelo Pandas a cada uso.
+        # As linhas da tabela e o texto de busca ficam na ordem de exibição (ID decrescente, mais recentes primeiro).
+        self._eq = self._arrays_equip(self.equip_df)
+        if self.equip_df.empty:
+            self._equip_linhas_ordenadas = []; self._equip_search_arr = np.empty(0, dtype=str)
+        else:
+            ordem = np.argsort(-self.equip_df['id'].to_numpy(), kind='stable')
+            valores, busca = self._linhas_e_busca_equip(self.equip_df)
+            self._equip_linhas_ordenadas = valores[ordem].tolist(); self._equip_search_arr = busca[ordem]
+
+        # Última 'Saída' de cada equipamento; montada só quando for consultada (ver get_last_movement_info).
+        self._ultimas_saidas = None
+
+        # Mapa {id: nome} dos equipamentos; também montado só na primeira consulta (ver _nome_por_id).
+        self._nomes_por_id = None
+
+        # Linhas HTML do relatório de movimentações entre setores; montadas no primeiro relatório (ver _linhas_html_mov_setores).
+        self._mov_setores_html = None
+
+        # Mapas {id: número da linha na planilha} de equipamentos e de movimentações entre setores,
+        # para localizar registros sem varrer o DataFrame.
+        self._equip_id_to_row = self._mapear_linhas_por_id(self.equip_df)
+        self._mov_setores_id_to_row = self._mapear_linhas_por_id(self.mov_setores_df)
+
+        # Guarda o próximo ID livre de cada aba, calculado a partir dos dados já baixados,
+        # para que os cadastros não precisem ler a coluna de IDs da planilha de novo.
+        self._proximos_ids = {
+            self.equip_sheet.title: self._maior_id(self.equip_df, 'id') + 1,
+            self.mov_sheet.title: self._maior_id(self.mov_df, 'id_movimentacao') + 1,
+            self.mov_setores_sheet.title: self._maior_id(self.mov_setores_df, 'id') + 1}
+
+    @staticmethod
+    def _completar_colunas_opcionais(df, padroes):
+
+        """
+        Cria as colunas opcionais (ausentes em planilhas antigas) que faltarem no DataFrame, já com o valor padrão.
+        Como as células vazias já chegam como '' (ver _values_to_dataframe), as telas e os relatórios
+        não precisam verificar nem preencher essas colunas a cada uso.
+
+        Args:
+            df (pd.DataFrame): O DataFrame da aba (alterado no próprio objeto).
+            padroes (dict): {coluna: valor padrão}.
+        """
+
+        if len(df.columns):
+            for col, padrao in padroes.items():
+                if col not in df.columns: df[col] = padrao
+
+    @staticmethod
+    def _preparar_equip_df(df):
+
+        """
+        Converte os tipos das colunas do DataFrame de equipamentos (alterado no próprio objeto).
+
+        Args:
+            df (pd.DataFrame): Os equipamentos, como saem de _values_to_dataframe.
+        """
+
+        if df.empty: return
+        # Faz a conversão de colunas importantes para o tipo numérico, todas as colunas de uma vez.
+        # 'errors=coerce' transforma valores inválidos em NaN, que são preenchidos com 1.
+        num_cols = ['id', 'quantidade', 'estoque_minimo']
+        df[num_cols] = df[num_cols].apply(pd.to_numeric, errors='coerce').fillna(1).astype('int64')
+        # Colunas com poucos valores distintos viram 'category': cada texto é guardado uma vez e as
+        # comparações (ex.: status == 'Descartado') são feitas sobre os códigos inteiros.
+        for col in ['status', 'categoria']: df[col] = df[col].astype('category')
+
+    def _preparar_mov_setores_df(self, df):
+
+        """
+        Completa as colunas opcionais e converte os tipos do DataFrame de movimentações entre setores
+        (alterado no próprio objeto).
+
+        Args:
+            df (pd.DataFrame): As movimentações, como saem de _values_to_dataframe.
+        """
+
+        self._completar_colunas_opcionais(df, COLUNAS_OPCIONAIS_MOV_SETORES)
+        if not df.empty and 'id' in df.columns:
+            df['id'] = pd.to_numeric(df['id'], errors='coerce')
             
             #Evita que ao colocar patrimonios com 6 dígitos ao emitir o relatório fica como NaN
-            self.mov_setores_df['patrimonio'] = self.mov_setores_df['patrimonio'].astype(str)
+            df['patrimonio'] = df['patrimonio'].astype(str)
+
+        # O status de regularização só tem dois valores; como 'category', os filtros do relatório comparam códigos inteiros.
+        if 'status_regularizacao' in df.columns: df['status_regularizacao'] = df['status_regularizacao'].astype('category')
             
-        if not self.mov_setores_df.empty and 'data_movimentacao' in self.mov_setores_df.columns:
-            self.mov_setores_df['data_movimentacao_dt'] = pd.to_datetime(self.mov_setores_df['data_movimentacao'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-    
+        if not df.empty and 'data_movimentacao' in df.columns:
+            df['data_movimentacao_dt'] = self._converter_datas(df['data_movimentacao'])
+
+    @staticmethod
+    def _datas_ns_mov_setores(df):
+
+        """
+        Retorna as datas das movimentações entre setores como int64 (nanossegundos), usadas pelos filtros do relatório.
+
+        Args:
+            df (pd.DataFrame): As movimentações já preparadas por _preparar_mov_setores_df.
+
+        Returns:
+            np.ndarray: Uma data por linha do DataFrame.
+        """
+
+        if 'data_movimentacao_dt' in df.columns: return df['data_movimentacao_dt'].to_numpy(dtype='datetime64[ns]').view('int64')
+        # Sem datas, nenhuma linha entra em um filtro por intervalo (o menor int64 é o mesmo valor de NaT).
+        return np.full(len(df), np.iinfo('int64').min, dtype='int64')
+
+    @staticmethod
+    def _arrays_equip(df):
+
+        """
+        Retorna as colunas dos equipamentos usadas pelo dashboard como arrays do NumPy.
+
+        Args:
+            df (pd.DataFrame): Os equipamentos já preparados por _preparar_equip_df.
+
+        Returns:
+            dict: Os arrays 'quantidade', 'estoque_minimo' e 'ativo' (status diferente de 'Descartado').
+        """
+
+        if df.empty: return {'quantidade': np.empty(0, dtype='int64'), 'estoque_minimo': np.empty(0, dtype='int64'), 'ativo': np.empty(0, dtype=bool)}
+        return {'quantidade': df['quantidade'].to_numpy(), 'estoque_minimo': df['estoque_minimo'].to_numpy(),
+                'ativo': (df['status'] != 'Descartado').to_numpy()} # Comparação feita nos códigos da categoria.
+
+    @staticmethod
+    def _linhas_e_busca_equip(df):
+
+        """
+        Monta, na ordem do DataFrame, as linhas da tabela de equipamentos e o texto pesquisável de cada uma.
+
+        Args:
+            df (pd.DataFrame): Os equipamentos já preparados por _preparar_equip_df (não vazio).
+
+        Returns:
+            tuple: (array com os valores de cada linha da tabela, array com o texto de busca de cada linha).
+        """
+
+        valores = df[["id", "nome", "numero_serie", "categoria", "descricao", "quantidade", "status"]].to_numpy()
+        # Texto pesquisável de cada equipamento: as colunas de busca concatenadas e em minúsculas.
+        # O '\n' separa as colunas para que um termo não seja encontrado "emendando" o fim de uma
+        # coluna com o início da outra.
+        colunas_busca = [df[col].astype(str) for col in ['nome', 'numero_serie', 'categoria', 'descricao']]
+        search_col = colunas_busca[0]
+        for col in colunas_busca[1:]: search_col = search_col + '\n' + col
+        return valores, search_col.str.lower().to_numpy(dtype=str)
+
+    @staticmethod
+    def _mapear_linhas_por_id(df):
+
+        """
+        Monta um dicionário {id: número da linha na planilha} a partir da coluna 'id' do DataFrame.
+        Se um ID se repetir, vale a primeira linha, como na busca feita pelo DataFrame.
+
+        Args:
+            df (pd.DataFrame): O DataFrame da aba, na mesma ordem das linhas da planilha.
+
+        Returns:
+            dict: O mapa de IDs para linhas (vazio se não houver dados).
+        """
+
+        if df.empty or 'id' not in df.columns: return {}
+        # A linha da planilha é a posição no DataFrame + 2 (linhas começam em 1 e a primeira é o cabeçalho).
+        # Percorre de trás para frente para que a primeira ocorrência de cada ID prevaleça.
+        ids = df['id'].tolist()
+        return {int(record_id): posicao + 2 for posicao, record_id in reversed(list(enumerate(ids))) if pd.notna(record_id)}
+
+    @staticmethod
+    def _maior_id(df, coluna):
+
+        """
+        Retorna o maior ID numérico de uma coluna do DataFrame (0 se não houver nenhum).
+
+        Args:
+            df (pd.DataFrame): O DataFrame da aba.
+            coluna (str): O nome da coluna de IDs.
+
+        Returns:
+            int: O maior ID encontrado.
+        """
+
+        if df.empty or coluna not in df.columns: return 0
+        maior = pd.to_numeric(df[coluna], errors='coerce').max()
+        return 0 if pd.isna(maior) else int(maior)
+
+    @staticmethod
+    def _ordenar_por_id_desc(df, coluna):
+
+        """
+        Ordena o DataFrame pela coluna de IDs (já numérica), do maior para o menor.
+        Usa um argsort estável do NumPy sobre os IDs negados; IDs inválidos (NaN) ficam no fim, como no sort_values.
+
+        Args:
+            df (pd.DataFrame): O DataFrame a ser ordenado.
+            coluna (str): O nome da coluna de IDs.
+
+        Returns:
+            pd.DataFrame: As linhas na nova ordem.
+        """
+
+        return df.iloc[np.argsort(-df[coluna].to_numpy(dtype='float64'), kind='stable')]
+
+    def _converter_datas(self, datas):
+
+        """
+        Converte uma coluna de datas no formato 'dd-mm-aaaa hh:mm:ss' para datetime.
+        Só os textos ainda não vistos são convertidos; os demais vêm de self._datas_convertidas,
+        então, depois da primeira carga, cada atualização converte apenas as datas novas.
+
+        Args:
+            datas (pd.Series): A coluna com as datas em texto.
+
+        Returns:
+            pd.Series: A coluna convertida (datas inválidas viram NaT).
+        """
+
+        novas = pd.unique(datas[~datas.isin(self._datas_convertidas.keys())])
+        if len(novas):
+            convertidas = pd.to_datetime(pd.Series(novas), format='%d-%m-%Y %H:%M:%S', errors='coerce')
+            self._datas_convertidas.update(zip(novas, convertidas))
+        return pd.to_datetime(datas.map(self._datas_convertidas))
+
+    def _get_value_ranges(self, ranges):
+
+        """
+        Retorna os valores das abas pedidas, usando a cópia local em disco quando
+        a planilha não foi modificada desde a última leitura.
+
+        A versão da planilha é a data de modificação informada pela API do Drive
+        ('modifiedTime'), uma consulta bem mais leve do que baixar todas as abas.
+
+        Args:
+            ranges (list): Os intervalos (abas) a serem lidos.
+
+        Returns:
+            list: A lista 'valueRanges', na mesma ordem de 'ranges'.
+        """
+
+        try: modified_time = self.spreadsheet.get_lastUpdateTime()
+        except Exception: modified_time = None # Sem a versão, não há como validar o cache.
+
+        # A cópia só é lida ou gravada se a pasta for acessível apenas pelo próprio usuário (ver _preparar_pasta_cache).
+        usar_cache = bool(modified_time) and self._preparar_pasta_cache()
+        cache_path = os.path.join(self._cache_dir, f"{self.spreadsheet.id}.json")
+        if usar_cache:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f: cache = json.load(f)
+                if cache.get('modified_time') == modified_time and cache.get('ranges') == ranges:
+                    return cache['value_ranges']
+            except (OSError, ValueError, AttributeError):
+                pass # Cache inexistente ou corrompido: busca os dados na planilha.
+
+        value_ranges = self.spreadsheet.values_batch_get(ranges)['valueRanges']
+
+        if usar_cache:
+            try:
+                # O arquivo é criado só com leitura e escrita para o usuário (0o600).
+                with open(os.open(cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+                    json.dump({'modified_time': modified_time, 'ranges': ranges, 'value_ranges': value_ranges}, f)
+            except OSError:
+                pass # Falhar ao gravar o cache não impede o uso do programa.
+        return value_ranges
+
+    def _preparar_pasta_cache(self):
+
+        """
+        Cria, se preciso, a pasta da cópia local com acesso apenas do próprio usuário (0o700) e confere
+        se ela pode ser usada: a cópia contém os dados da planilha, e uma pasta de outro usuário (ou aberta
+        a outros) permitiria ler esses dados ou plantar uma cópia falsa.
+
+        Returns:
+            bool: True se a pasta é segura para ler e gravar a cópia local.
+        """
+
+        try:
+            os.makedirs(self._cache_dir, mode=0o700, exist_ok=True)
+            if os.name == 'nt': return True # No Windows, %LOCALAPPDATA% já fica protegida pelas permissões do perfil do usuário.
+            info = os.lstat(self._cache_dir)
+            if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid(): return False # Link simbólico ou pasta de outro usuário.
+            if info.st_mode & 0o077: os.chmod(self._cache_dir, 0o700) # Pasta criada antes com permissões mais abertas.
+            return True
+        except OSError:
+            return False # Sem pasta utilizável, os dados são buscados direto da planilha.
+
+    def _invalidar_cache(self):
+
+        """Apaga a cópia local dos dados. Chamada após qualquer escrita na planilha."""
+
+        self._versao_dados += 1
+        try: os.remove(os.path.join(self._cache_dir, f"{self.spreadsheet.id}.json"))
+        except OSError: pass
+
+    def _values_to_dataframe(self, value_range):
+
+        """
+        Converte um intervalo retornado pela API do Google Sheets em um DataFrame.
+        A primeira linha é usada como cabeçalho, assim como no get_all_records().
+
+        Args:
+            value_range (dict): Um item de 'valueRanges' da resposta do values_batch_get.
+
+        Returns:
+            pd.DataFrame: Os dados da aba (vazio se a aba não tiver registros).
+        """
+
+        linhas = value_range.get('values', [])
+        if not linhas: return pd.DataFrame()
+
+        header = linhas[0]; largura = len(header); dados = linhas[1:]
+
+        # A API omite as células vazias no fim de cada linha; o pandas completa as linhas curtas com nulos
+        # até o tamanho da maior. Só é preciso mexer nas linhas quando a maior não tem a largura do cabeçalho.
+        maior = max(map(len, dados), default=largura)
+        if maior > largura: dados = [linha[:largura] for linha in dados] # Células sem título de coluna.
+        elif maior < largura: dados = [dados[0] + [''] * (largura - len(dados[0]))] + dados[1:]
+
+        # Monta o DataFrame já com o tipo texto, sem passar linha a linha em Python; os nulos viram ''.
+        return pd.DataFrame(dados, columns=header, dtype=str).fillna('')
+
     def refresh_all_data(self):
         
         """
@@ -363,51 +968,278 @@ class App(tk.Tk):
         """
         
         self.refresh_dataframes(); 
+        self._atualizar_interface()
+
+    def _aplicar_nova_linha_local(self, sheet, linha):
+
+        """
+        Atualiza a interface com um registro recém-gravado sem baixar a planilha de novo.
+        A linha é acrescentada aos valores da última leitura e ao DataFrame da sua aba, e só as estruturas
+        derivadas dessa aba (mapas de IDs, linhas da tabela, texto de busca etc.) recebem o novo registro;
+        as outras abas não são tocadas. A sincronização periódica depois traz o estado oficial da planilha.
+
+        Args:
+            sheet (gspread.Worksheet): A aba onde a linha foi gravada.
+            linha (list): A linha gravada, na ordem das colunas da planilha.
+        """
+
+        abas = [self.equip_sheet.title, self.mov_sheet.title, self.mov_setores_sheet.title]
+        valores = self._value_ranges[abas.index(sheet.title)].get('values')
+        if not valores: self.refresh_all_data(); return # Aba ainda sem cabeçalho: busca tudo da planilha.
+
+        # A API devolve os valores como texto, então a linha é guardada do mesmo jeito.
+        linha = ['' if valor is None else str(valor) for valor in linha]; valores.append(linha)
+        # O registro novo passa pela mesma conversão da carga, como um DataFrame de uma linha.
+        novo = self._values_to_dataframe({'values': [valores[0], linha]})
+
+        if sheet.title == self.equip_sheet.title and not self.equip_df.empty: self._acrescentar_equipamento(novo)
+        elif sheet.title == self.mov_setores_sheet.title and not self.mov_setores_df.empty: self._acrescentar_mov_setores(novo)
+        else: self._apply_dataframes(self._value_ranges); self._atualizar_interface() # Primeiro registro da aba: monta tudo.
+
+    def _acrescentar_equipamento(self, novo):
+
+        """
+        Acrescenta um equipamento recém-gravado ao DataFrame e às estruturas derivadas, e atualiza a tela.
+
+        Args:
+            novo (pd.DataFrame): O registro, com uma linha, como sai de _values_to_dataframe.
+        """
+
+        self._preparar_equip_df(novo)
+        ids = self.equip_df['id'].to_numpy(); novo_id = int(novo['id'].iloc[0])
+        self.equip_df = pd.concat([self.equip_df, novo], ignore_index=True)
+        # O concat junta categorias diferentes como texto comum; a conversão devolve o tipo 'category'.
+        for col in ['status', 'categoria']: self.equip_df[col] = self.equip_df[col].astype('category')
+        self._eq = self._arrays_equip(self.equip_df)
+
+        # Na ordem de exibição (ID decrescente, ordenação estável), o registro entra depois de todos os de ID maior ou igual.
+        posicao = int(np.count_nonzero(ids >= novo_id))
+        valores, busca = self._linhas_e_busca_equip(novo)
+        self._equip_linhas_ordenadas.insert(posicao, valores.tolist()[0])
+        # O concatenate (e não o np.insert) alarga o tipo do array de texto se o novo texto for mais longo.
+        self._equip_search_arr = np.concatenate([self._equip_search_arr[:posicao], busca, self._equip_search_arr[posicao:]])
+
+        if self._nomes_por_id is not None: self._nomes_por_id[novo_id] = novo['nome'].iloc[0]
+        self._equip_id_to_row.setdefault(novo_id, len(self.equip_df) + 1) # Vale a primeira linha de cada ID.
+        titulo = self.equip_sheet.title; self._proximos_ids[titulo] = max(self._proximos_ids.get(titulo, 1), novo_id + 1)
+
+        self.update_dashboard(); self.filtrar_equipamentos()
+
+    def _acrescentar_mov_setores(self, novo):
+
+        """
+        Acrescenta uma movimentação entre setores recém-gravada ao DataFrame e às estruturas derivadas,
+        e atualiza a tabela do histórico.
+
+        Args:
+            novo (pd.DataFrame): O registro, com uma linha, como sai de _values_to_dataframe.
+        """
+
+        self._preparar_mov_setores_df(novo)
+        ids = self.mov_setores_df['id'].to_numpy(dtype='float64'); novo_id = novo['id'].iloc[0]
+        self.mov_setores_df = pd.concat([self.mov_setores_df, novo], ignore_index=True)
+        if 'status_regularizacao' in self.mov_setores_df.columns:
+            self.mov_setores_df['status_regularizacao'] = self.mov_setores_df['status_regularizacao'].astype('category')
+        self._mov_setores_datas_ns = np.concatenate([self._mov_setores_datas_ns, self._datas_ns_mov_setores(novo)])
+        if self._mov_setores_html is not None:
+            self._mov_setores_html = pd.concat([self._mov_setores_html, self._montar_html_mov_setores(novo)], ignore_index=True)
+
+        if pd.notna(novo_id):
+            novo_id = int(novo_id); titulo = self.mov_setores_sheet.title
+            self._mov_setores_id_to_row.setdefault(novo_id, len(self.mov_setores_df) + 1) # Vale a primeira linha de cada ID.
+            self._proximos_ids[titulo] = max(self._proximos_ids.get(titulo, 1), novo_id + 1)
+            # Mesma regra de _ordenar_por_id_desc: depois dos IDs maiores ou iguais (os inválidos ficam no fim).
+            posicao = int(np.count_nonzero(ids >= novo_id))
+        else: posicao = len(self._mov_linhas)
+
+        self._mov_linhas.insert(posicao, self._linhas_tabela_mov_setores(novo)[0])
+        self._exibir_mov_setores()
+
+    def _sincronizacao_periodica(self):
+
+        """
+        Busca os dados da planilha em segundo plano a cada INTERVALO_SINCRONIZACAO_MS.
+        A interface só é remontada se algo mudou, e falhas (ex: sem internet) são ignoradas
+        até a próxima tentativa, sem interromper o usuário.
+        """
+
+        self.after(INTERVALO_SINCRONIZACAO_MS, self._sincronizacao_periodica)
+        if self._refresh_em_andamento: return
+        self._refresh_em_andamento = True; versao = self._versao_dados
+
+        def ao_concluir(value_ranges):
+            self._refresh_em_andamento = False
+            # Um clique em "Atualizar Dados" feito durante esta busca é atendido agora, com uma busca própria.
+            if self._refresh_manual_pendente: self._buscar_com_feedback(); return
+            # Ignora o resultado se houve uma escrita durante a busca (ele pode não conter o novo registro).
+            if versao != self._versao_dados or value_ranges == self._value_ranges: return
+            self._apply_dataframes(value_ranges); self._atualizar_interface()
+
+        def ao_falhar(erro):
+            self._refresh_em_andamento = False
+            if self._refresh_manual_pendente: self._buscar_com_feedback()
+
+        self._executar_em_segundo_plano(self._fetch_remote, ao_concluir, ao_falhar)
+
+    def _atualizar_interface(self):
+
+        """Atualiza o dashboard e as tabelas a partir dos DataFrames já carregados."""
+
         self.update_dashboard(); 
         self.filtrar_equipamentos(); # Filtra com o termo atual (ou carrega tudo se vazio)
         self.carregar_mov_setores_treeview()
-
     
     def refresh_with_feedback(self):
         
         """
-        Executa a atualização de dados, mas muda o cursor do mouse para 'espera'
-        para dar um feedback visual ao usuário de que algo está acontecendo.
+        Executa a atualização de dados em segundo plano, mudando o cursor do mouse para 'espera'
+        para dar um feedback visual ao usuário. A janela continua respondendo durante a busca.
+        Usada pelo botão "Atualizar Dados" e após as gravações feitas em segundo plano.
         """
         
+        if self._refresh_manual_pendente: return # Ignora cliques repetidos enquanto já está atualizando.
+        self._refresh_manual_pendente = True
         self.config(cursor="watch"); # Muda o cursor para "carregando"
-        self.update_idletasks()  # Força a atualização da UI
-        self.refresh_all_data()
-        self.config(cursor="") # Retorna o cursor ao normal
+
+        # Se a sincronização periódica estiver buscando os dados, a busca do clique começa assim que ela
+        # terminar (ver _sincronizacao_periodica); até lá, o cursor de espera já indica que o clique foi aceito.
+        if not self._refresh_em_andamento: self._buscar_com_feedback()
+
+    def _buscar_com_feedback(self):
+
+        """Faz a busca pedida em refresh_with_feedback e, ao final, devolve o cursor ao normal."""
+
+        self._refresh_em_andamento = True; versao = self._versao_dados
+
+        def ao_concluir(value_ranges):
+            self._refresh_em_andamento = False
+            # Assim como na sincronização periódica, descarta o resultado se houve uma escrita durante a
+            # busca: ele pode não conter o novo registro (e recalcularia os próximos IDs a partir dele).
+            # Como a atualização foi pedida (pelo usuário ou após uma gravação), busca de novo.
+            if versao != self._versao_dados: self._buscar_com_feedback(); return
+            self._refresh_manual_pendente = False; self.config(cursor="") # Retorna o cursor ao normal
+            self._apply_dataframes(value_ranges); self._atualizar_interface()
+
+        def ao_falhar(erro):
+            self._refresh_em_andamento = False; self._refresh_manual_pendente = False; self.config(cursor="")
+            messagebox.showerror("Erro de Conexão", f"Não foi possível atualizar os dados.\n\nErro: {erro}")
+
+        self._executar_em_segundo_plano(self._fetch_remote, ao_concluir, ao_falhar)
+
+    def _executar_em_segundo_plano(self, trabalho, ao_concluir, ao_falhar):
+
+        """
+        Executa uma tarefa demorada (ex: chamadas à API) em uma thread separada.
+        O Tkinter não pode ser usado fora da thread principal, então o resultado é
+        devolvido à interface através do self.after().
+
+        Args:
+            trabalho (callable): Função sem argumentos, que não deve tocar em widgets.
+            ao_concluir (callable): Recebe o retorno de 'trabalho', executada na thread da interface.
+            ao_falhar (callable): Recebe a exceção lançada, executada na thread da interface.
+        """
+
+        def executar():
+            try: resultado = trabalho()
+            except Exception as e: self.after(0, ao_falhar, e); return
+            self.after(0, ao_concluir, resultado)
+
+        threading.Thread(target=executar, daemon=True).start()
 
     def carregar_mov_setores_treeview(self):
         
         """Popula a tabela de histórico de movimentação entre setores com os dados do DataFrame."""
         
-        # Limpa a tabela antes de inserir novos dados
-        for i in self.mov_setores_tree.get_children(): self.mov_setores_tree.delete(i)
-
-        # Configura as 'tags' para colorir as linhas com base no status.
-        self.mov_setores_tree.tag_configure('Pendente', background="#FAF6C8") # Amarelo claro
-        self.mov_setores_tree.tag_configure('Regularizado', background="#CFF7D1") #Verde Claro
+        linhas = [] # Linhas a exibir, na ordem da tabela: (id, values, tags).
 
         if hasattr(self, 'mov_setores_df') and not self.mov_setores_df.empty:
             # Ordena pelo ID de forma decrescente para mostrar os mais recentes primeiro.
-            df_sorted = self.mov_setores_df.sort_values(by="id", ascending=False)
+            linhas = self._linhas_tabela_mov_setores(self._ordenar_por_id_desc(self.mov_setores_df, "id"))
+
+        # Guarda a lista completa; só as primeiras linhas vão para a tabela agora.
+        self._mov_linhas = linhas
+        self._exibir_mov_setores()
+
+    @staticmethod
+    def _linhas_tabela_mov_setores(df):
 
-            # Garante que colunas opcionais existam para evitar erros.
-            for col in ['chamado', 'solicitante', 'status_regularizacao']:
-                if col not in df_sorted.columns: df_sorted[col] = ''
-            df_sorted = df_sorted.fillna('') # Substitui valores nulos (NaN) por strings vazias.
+        """
+        Monta, na ordem do DataFrame, as linhas da tabela do histórico de movimentações entre setores.
+
+        Args:
+            df (pd.DataFrame): As movimentações, já na ordem de exibição.
+
+        Returns:
+            list: As linhas como tuplas (id, values, tags), no formato de _sincronizar_treeview.
+        """
 
-            # Seleciona e reordena as colunas para exibição.
-            df_display = df_sorted[["id", "data_movimentacao", "status_regularizacao", "tipo_equipamento", "patrimonio", "servicetag", "setor_origem", "setor_destino", "responsavel", "chamado", "solicitante"]]
+        # Seleciona e reordena as colunas para exibição. As colunas opcionais já existem desde a carga
+        # dos dados, e só o ID (numérico) pode ter valores nulos, que viram strings vazias.
+        df_display = df[["id", "data_movimentacao", "status_regularizacao", "tipo_equipamento", "patrimonio", "servicetag", "setor_origem", "setor_destino", "responsavel", "chamado", "solicitante"]].fillna({'id': ''})
 
-            # Itera sobre o DataFrame e insere cada linha na tabela (Treeview).
-            for index, row in df_display.iterrows():
-                status = row['status_regularizacao'] if row['status_regularizacao'] else 'Pendente'
-                tag = status if status in ['Pendente', 'Regularizado'] else 'Pendente'
-                self.mov_setores_tree.insert("", "end", values=list(row), tags=(tag,))
+        # Converte a tabela inteira em listas de uma só vez e calcula as tags de cor de forma vetorizada:
+        # qualquer status diferente de 'Regularizado' (inclusive vazio) é exibido como 'Pendente'.
+        valores = df_display.to_numpy().tolist()
+        tags = np.where(df_display['status_regularizacao'].to_numpy() == 'Regularizado', 'Regularizado', 'Pendente').tolist()
+        return [(row[0], row, (tag,)) for row, tag in zip(valores, tags)]
+
+    def _exibir_mov_setores(self):
+
+        """Aplica na tabela do histórico as linhas que devem estar visíveis, apenas com o que mudou."""
+
+        self._sincronizar_treeview(self.mov_setores_tree, self._mov_row_iids, self._mov_linhas[:self._mov_limite_exibido])
+
+    def _on_mov_setores_scroll(self, first, last):
+
+        """
+        Recebe a posição de rolagem da tabela do histórico, atualiza a barra de rolagem e,
+        quando o usuário chega perto do fim, insere o próximo lote de linhas.
+
+        Args:
+            first (str): Fração do início da área visível (enviada pela Treeview).
+            last (str): Fração do fim da área visível.
+        """
+
+        self.mov_setores_scrollbar.set(first, last)
+        # 'first > 0' evita carregar tudo enquanto a tabela ainda não foi desenhada (ela informa 0.0 1.0).
+        if float(first) > 0.0 and float(last) >= 0.95 and self._mov_limite_exibido < len(self._mov_linhas):
+            self._mov_limite_exibido += LOTE_LINHAS_TABELA
+            self.after_idle(self._exibir_mov_setores)
+
+    def _sincronizar_treeview(self, tree, linhas_exibidas, linhas):
+
+        """
+        Atualiza uma Treeview aplicando somente as diferenças em relação ao que já está exibido,
+        em vez de apagar e reinserir todas as linhas a cada atualização.
+
+        Args:
+            tree (ttk.Treeview): A tabela a ser atualizada.
+            linhas_exibidas (dict): Mapa {chave: (iid, values, tags)} do conteúdo atual da tabela.
+                                    É atualizado no lugar.
+            linhas (list): As linhas desejadas, na ordem de exibição, como tuplas (id, values, tags).
+        """
+
+        # A chave é (id, ocorrência), para que IDs repetidos na planilha continuem aparecendo.
+        ocorrencias = {}; chaves = []
+        for registro_id, values, tags in linhas:
+            n = ocorrencias.get(registro_id, 0); ocorrencias[registro_id] = n + 1
+            chaves.append((registro_id, n))
+
+        # Remove as linhas que deixaram de existir.
+        chaves_novas = set(chaves)
+        for chave in [c for c in linhas_exibidas if c not in chaves_novas]:
+            tree.delete(linhas_exibidas.pop(chave)[0])
+
+        # Insere as linhas novas na posição correta e atualiza apenas as que foram alteradas.
+        # As linhas que já existiam mantêm a ordem entre si, então inserir na ordem final basta.
+        for posicao, (chave, (registro_id, values, tags)) in enumerate(zip(chaves, linhas)):
+            atual = linhas_exibidas.get(chave)
+            if atual is None:
+                iid = tree.insert("", posicao, values=values, tags=tags)
+                linhas_exibidas[chave] = (iid, values, tags)
+            elif atual[1] != values or atual[2] != tags:
+                tree.item(atual[0], values=values, tags=tags)
+                linhas_exibidas[chave] = (atual[0], values, tags)
 
     def registrar_movimentacao_setor(self):
         
@@ -439,7 +1271,8 @@ class App(tk.Tk):
         # --- Registro na Planilha ---
         novo_id = self._get_next_id(self.mov_setores_sheet); data = datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
         nova_linha = [novo_id, data, responsavel, tipo_equip, patrimonio, servicetag, origem, destino, obs, chamado, solicitante, 'Pendente']
-        self.mov_setores_sheet.append_row(nova_linha); messagebox.showinfo("Sucesso", "Movimentação entre setores registrada com sucesso!")
+        self.mov_setores_sheet.append_row(nova_linha); self._invalidar_cache()
+        messagebox.showinfo("Sucesso", "Movimentação entre setores registrada com sucesso!")
         
         # --- Limpeza do Formulário ---
         self.mov_tipo_equip_combo.set(''); self.mov_entry_patrimonio.delete(0, tk.END); self.mov_entry_servicetag.delete(0, tk.END)
@@ -447,8 +1280,8 @@ class App(tk.Tk):
         self.mov_combo_origem.set(''); self.mov_combo_destino.set(''); self.mov_entry_responsavel.delete(0, tk.END); self.mov_text_obs.delete("1.0", tk.END)
         self.mov_entry_chamado.delete(0, tk.END); self.mov_entry_solicitante.delete(0, tk.END)
         
-        # Atualiza a interface para mostrar o novo registro.
-        self.refresh_all_data()
+        # Atualiza a interface para mostrar o novo registro, a partir dos dados locais.
+        self._aplicar_nova_linha_local(self.mov_setores_sheet, nova_linha)
 
     def update_dashboard(self):
         
@@ -456,101 +1289,141 @@ class App(tk.Tk):
         Calcula as estatísticas do dashboard e atualiza os valores nos cards da interface.
         É chamado sempre que os dados são atualizados.
         """
-        # --- Lógica para o Card de Total de Itens e Tipos Únicos ---
-        if self.equip_df.empty: self.total_itens_var.set("0"); self.tipos_unicos_var.set("0"); self.estoque_baixo_var.set("0")
-        
-        # Se não houver dados, zera os contadores para evitar erros.
-        else:
-            # Filtra o DataFrame para considerar apenas itens que não foram descartados.
-            df_ativo = self.equip_df[self.equip_df['status'] != 'Descartado']
-            
-            # Soma a coluna 'quantidade' de todos os itens ativos.
-            self.total_itens_var.set(str(df_ativo['quantidade'].sum())); 
-            
-            # Conta o número de linhas (tipos de itens únicos) no DataFrame filtrado.
-            self.tipos_unicos_var.set(str(len(df_ativo)))
-            
-            # Conta quantos itens têm a quantidade atual menor ou igual ao estoque mínimo.
-            low_stock_count = (df_ativo['quantidade'] <= df_ativo['estoque_minimo']).sum(); self.estoque_baixo_var.set(str(low_stock_count))
-        
-        # --- Lógica para o Card de Movimentações no Mês --
-        if self.mov_df.empty: self.mov_mes_var.set("0")
-        else:
-            now = datetime.datetime.now()
-            
-            # Filtra o DataFrame de movimentações para contar apenas os registros do mês e ano atuais.
-            mov_mes_count = len(self.mov_df[(self.mov_df['data_movimentacao_dt'].dt.month == now.month) & (self.mov_df['data_movimentacao_dt'].dt.year == now.year)])
-            self.mov_mes_var.set(str(mov_mes_count))
+        # --- Dados para os Cards de Total de Itens, Tipos Únicos e Estoque Baixo ---
+        # Arrays montados no carregamento (vazios se não houver dados, para que os contadores fiquem zerados),
+        # incluindo a máscara dos itens que não foram descartados (os únicos considerados).
+        quantidade, estoque_minimo, ativo = self._eq['quantidade'], self._eq['estoque_minimo'], self._eq['ativo']
+        
+        # --- Dados para o Card de Movimentações no Mês ---
+        # As datas já vêm como inteiros (nanossegundos) desde o carregamento;
+        # o mês atual vira o intervalo [início do mês, início do próximo).
+        datas_mov_ns = self._mov_datas_ns
+        inicio_mes = np.datetime64(datetime.datetime.now().strftime('%Y-%m'), 'M')
+        inicio_mes_ns, fim_mes_ns = np.array([inicio_mes, inicio_mes + 1]).astype('datetime64[ns]').view('int64')
+        
+        # Calcula todos os números de uma vez e atualiza os cards.
+        total_unidades, tipos_unicos, estoque_baixo, mov_mes = _estatisticas_dashboard(quantidade, estoque_minimo, ativo, datas_mov_ns, inicio_mes_ns, fim_mes_ns)
+        self._set_if_changed(self.total_itens_var, total_unidades); self._set_if_changed(self.tipos_unicos_var, tipos_unicos)
+        self._set_if_changed(self.estoque_baixo_var, estoque_baixo); self._set_if_changed(self.mov_mes_var, mov_mes)
+
+    @staticmethod
+    def _set_if_changed(var, valor):
+
+        """
+        Atualiza uma StringVar só quando o texto muda, evitando que o Tk redesenhe o rótulo à toa.
+
+        Args:
+            var (tk.StringVar): A variável ligada ao rótulo.
+            valor: O novo valor (convertido para texto).
+        """
+
+        texto = str(valor)
+        if var.get() != texto: var.set(texto)
+
+    def _on_search_key(self, event=None):
+
+        """
+        Agenda a filtragem para 180 ms após a última tecla, cancelando o agendamento anterior.
+        Assim, digitar uma palavra inteira dispara um único filtro em vez de um por letra.
+        Teclas que não mudam o texto (setas, Shift, etc.) não disparam nada.
+        """
+
+        if self._filter_after_id: self.after_cancel(self._filter_after_id); self._filter_after_id = None
+        if self.search_var.get().lower() == self._ultimo_termo_busca: return # A tabela já mostra este termo.
+        self._filter_after_id = self.after(180, self._run_scheduled_filter)
+
+    def _run_scheduled_filter(self):
+
+        """Executa o filtro agendado por _on_search_key."""
+
+        self._filter_after_id = None
+        self.filtrar_equipamentos()
+
     def filtrar_equipamentos(self, event=None):
         
         """
         Filtra os equipamentos na tabela (Treeview) com base no termo digitado na barra de pesquisa.
-        Esta função é chamada a cada tecla pressionada no campo de busca.
+        Esta função é chamada após uma pausa na digitação (ver _on_search_key) e após cada atualização dos dados.
         """
         
         # Pega o texto da busca e converte para minúsculas para uma busca não sensível a maiúsculas.
-        search_term = self.search_var.get().lower()
+        search_term = self.search_var.get().lower(); self._ultimo_termo_busca = search_term
         
         # Se o campo de busca estiver vazio, carrega todos os equipamentos.
         if not search_term: self.carregar_equipamentos_treeview(); return
-        if not self.equip_df.empty:
-            
-            # Filtra o DataFrame, procurando o termo de busca em várias colunas.
-            # `astype(str).str.lower().str.contains` garante que a busca funcione em qualquer tipo de dado.
-            df_filtered = self.equip_df[
-                self.equip_df['nome'].astype(str).str.lower().str.contains(search_term, na=False) | 
-                self.equip_df['numero_serie'].astype(str).str.lower().str.contains(search_term, na=False) | 
-                self.equip_df['categoria'].astype(str).str.lower().str.contains(search_term, na=False) | 
-                self.equip_df['descricao'].astype(str).str.lower().str.contains(search_term, na=False)
-                ]
             
-            # Popula a tabela com o DataFrame já filtrado.
-            self.populate_treeview(df_filtered)
+        # Filtra com uma única busca no texto pré-calculado (nome, série, categoria e descrição).
+        # O termo é tratado como texto literal, então caracteres como '(' não causam erro.
+        # Como o texto e as linhas estão na mesma ordem, as posições encontradas já são as linhas a exibir.
+        mask = np.char.find(self._equip_search_arr, search_term) >= 0
+        linhas = self._equip_linhas_ordenadas
+        self.populate_treeview([linhas[i] for i in np.flatnonzero(mask).tolist()])
     def carregar_equipamentos_treeview(self): 
         """Função de atalho para popular a tabela com todos os equipamentos (sem filtro)."""
         
-        self.populate_treeview(self.equip_df) 
-    def populate_treeview(self, df):
+        self.populate_treeview(self._equip_linhas_ordenadas) 
+    def populate_treeview(self, linhas):
         
         """
-        Limpa a tabela de equipamentos e a preenche com os dados de um DataFrame.
+        Limpa a tabela de equipamentos e a preenche com as linhas informadas.
         
         Args:
-            df (pd.DataFrame): O DataFrame contendo os itens a serem exibidos.
+            linhas (list): As linhas a exibir, já na ordem da tabela (ver _equip_linhas_ordenadas).
         """
         
-        # Primeiro, apaga todas as linhas existentes na tabela para evitar duplicatas.
-        for i in self.tree.get_children(): self.tree.delete(i)
-        if not df.empty:
-            # Ordena pelo ID de forma decrescente para mostrar os itens mais recentes primeiro.
-            df_sorted = df.sort_values(by="id", ascending=False)
-            
-            # Seleciona e reordena as colunas para garantir que elas correspondam à ordem na Treeview.
-            df_display = df_sorted[["id", "nome", "numero_serie", "categoria", "descricao", "quantidade", "status"]]
-            
-            # Itera sobre cada linha do DataFrame e a insere na tabela.
-            for index, row in df_display.iterrows(): self.tree.insert("", "end", values=list(row))
+        # Primeiro, apaga todas as linhas existentes na tabela (em uma única chamada) para evitar duplicatas.
+        self.tree.delete(*self.tree.get_children())
+        self._equip_linhas = linhas; self._equip_exibidas = 0
+        
+        # Insere só o primeiro lote; o restante entra conforme o usuário rola a tabela.
+        self._exibir_mais_equipamentos()
+
+    def _exibir_mais_equipamentos(self):
+
+        """Insere no fim da tabela de equipamentos o próximo lote de linhas ainda não exibidas."""
+
+        lote = self._equip_linhas[self._equip_exibidas:self._equip_exibidas + LOTE_LINHAS_TABELA]
+        
+        # Insere cada linha na tabela; 'insert' local evita buscar o método a cada iteração.
+        insert = self.tree.insert
+        for row in lote: insert("", "end", values=row)
+        self._equip_exibidas += len(lote)
+
+    def _on_equip_scroll(self, first, last):
+
+        """
+        Recebe a posição de rolagem da tabela de equipamentos, atualiza a barra de rolagem e,
+        quando o usuário chega perto do fim, agenda a inserção do próximo lote de linhas.
+
+        Args:
+            first (str): Fração do início da área visível (enviada pela Treeview).
+            last (str): Fração do fim da área visível.
+        """
+
+        self.tree_scrollbar.set(first, last)
+        # 'first > 0' evita carregar tudo enquanto a tabela ainda não foi desenhada (ela informa 0.0 1.0).
+        if float(first) > 0.0 and float(last) >= 0.95 and self._equip_exibidas < len(self._equip_linhas):
+            self.after_idle(self._exibir_mais_equipamentos)
             
-    def _get_next_id(self, sheet):
+    def _get_next_id(self, sheet, quantidade=1):
         
         """
-        Calcula o próximo ID disponível para um novo registro em uma determinada aba da planilha.
+        Retorna o próximo ID disponível para um novo registro em uma determinada aba da planilha
+        e reserva 'quantidade' IDs seguidos a partir dele.
+        O valor vem dos dados da última atualização (sem nova leitura da planilha) e é recalculado
+        a cada refresh, que é feito logo após toda gravação.
         
         Args:
             sheet (gspread.Worksheet): A aba da planilha a ser verificada.
+            quantidade (int): Quantos registros serão gravados de uma vez.
             
         Returns:
             int: O próximo ID a ser usado.
         """
         
-        # Pega todos os valores da primeira coluna (coluna de IDs), ignorando o cabeçalho.
-        ids = sheet.col_values(1)[1:]; 
-        
-        # Se não houver IDs, o primeiro será 1.
-        if not ids: return 1
-        
-        # Converte todos os valores para inteiros (ignorando textos) e retorna o maior valor + 1.
-        return max([int(i) for i in ids if str(i).isdigit()], default=0) + 1
+        proximo = self._proximos_ids.get(sheet.title, 1)
+        self._proximos_ids[sheet.title] = proximo + quantidade
+        return proximo
     
     def _find_sheet_row_index_by_id(self, df, record_id):
         
@@ -565,8 +1438,12 @@ class App(tk.Tk):
             int or None: O número da linha na planilha, ou None se não for encontrado.
         """
         
+        # Para as abas com mapa montado na última atualização, a consulta é direta, sem varrer a tabela.
+        if df is self.equip_df: return self._equip_id_to_row.get(int(record_id))
+        if df is self.mov_setores_df: return self._mov_setores_id_to_row.get(int(record_id))
+        
+        # A coluna 'id' já vem numérica do carregamento (_apply_dataframes), então não é convertida aqui.
         try:
-            df['id'] = pd.to_numeric(df['id']);
             # Encontra o índice do DataFrame (baseado em 0) para o ID fornecido. 
             df_index = df.index[df['id'] == record_id].tolist()[0]
             # Retorna o índice do DataFrame + 2.
@@ -592,10 +1469,9 @@ class App(tk.Tk):
         
         # --- Validação dos Dados ---
         if not nome or not categoria: messagebox.showwarning("Campos Vazios", "Os campos 'Nome' e 'Categoria' são obrigatórios."); return
-        try:
-            quantidade = int(quantidade_str); estoque_minimo = int(estoque_minimo_str)
-            if quantidade < 0 or estoque_minimo < 0: messagebox.showwarning("Valor Inválido", "As quantidades não podem ser negativas."); return
-        except ValueError: messagebox.showwarning("Valor Inválido", "As quantidades devem ser números inteiros."); return
+        if not (_INT_RE.fullmatch(quantidade_str) and _INT_RE.fullmatch(estoque_minimo_str)): messagebox.showwarning("Valor Inválido", "As quantidades devem ser números inteiros."); return
+        quantidade = int(quantidade_str); estoque_minimo = int(estoque_minimo_str)
+        if quantidade < 0 or estoque_minimo < 0: messagebox.showwarning("Valor Inválido", "As quantidades não podem ser negativas."); return
         
         # --- Preparação e Registro dos Dados ---
         novo_id = self._get_next_id(self.equip_sheet); 
@@ -605,6 +1481,7 @@ class App(tk.Tk):
         # A ordem dos itens na lista deve ser EXATAMENTE a mesma ordem das colunas na planilha.
         nova_linha = [novo_id, nome, serie, descricao, quantidade, status, data_cadastro, estoque_minimo, categoria]
         self.equip_sheet.append_row(nova_linha); 
+        self._invalidar_cache()
         messagebox.showinfo("Sucesso", "Equipamento adicionado com sucesso!")
         
         # --- Limpeza do Formulário Após Adicionar ---
@@ -616,8 +1493,8 @@ class App(tk.Tk):
         self.entry_estoque_minimo.insert(0, self.default_estoque_minimo); 
         self.combo_categoria.set('')
         
-        # Atualiza a interface para exibir o novo item.
-        self.refresh_all_data()
+        # Atualiza a interface para exibir o novo item, a partir dos dados locais.
+        self._aplicar_nova_linha_local(self.equip_sheet, nova_linha)
         
     def salvar_edicao(self, item_id, nome, categoria, serie, descricao, quantidade_str, estoque_minimo_str, window):
         
@@ -633,14 +1510,13 @@ class App(tk.Tk):
         if not nome or not categoria: 
             messagebox.showwarning("Campo Vazio", "Os campos 'Nome' e 'Categoria' não podem ficar vazios.", parent=window); 
             return
-        try:
-            quantidade = int(quantidade_str); estoque_minimo = int(estoque_minimo_str)
-            if quantidade < 0 or estoque_minimo < 0: 
-                messagebox.showwarning("Valor Inválido", "As quantidades não podem ser negativas.", parent=window); 
-                return
-        except ValueError: 
+        if not (_INT_RE.fullmatch(quantidade_str) and _INT_RE.fullmatch(estoque_minimo_str)): 
             messagebox.showwarning("Valor Inválido", "As quantidades devem ser números inteiros.", parent=window); 
             return
+        quantidade = int(quantidade_str); estoque_minimo = int(estoque_minimo_str)
+        if quantidade < 0 or estoque_minimo < 0: 
+            messagebox.showwarning("Valor Inválido", "As quantidades não podem ser negativas.", parent=window); 
+            return
         
         # --- Atualização na Planilha --
         row_index = self._find_sheet_row_index_by_id(self.equip_df, item_id)
@@ -649,14 +1525,16 @@ class App(tk.Tk):
             return
         novo_status = "Em Estoque" if quantidade > 0 else "Fora de Estoque"
         
-        # Preserva a data de cadastro original.
-        data_cadastro_original = self.equip_df.loc[self.equip_df['id'] == item_id, 'data_cadastro'].iloc[0]
+        # Preserva a data de cadastro original, lida direto pela posição da linha (linha da planilha - 2),
+        # sem varrer a coluna de IDs de novo.
+        data_cadastro_original = self.equip_df['data_cadastro'].iat[row_index - 2]
         
         # Monta a linha com os dados atualizados na ordem correta das colunas.
         linha_atualizada = [item_id, nome, serie, descricao, quantidade, novo_status, data_cadastro_original, estoque_minimo, categoria]
         
         # Atualiza a linha inteira na planilha de uma só vez para maior eficiência.
         self.equip_sheet.update(f'A{row_index}:I{row_index}', [linha_atualizada]); 
+        self._invalidar_cache()
         messagebox.showinfo("Sucesso", "Equipamento atualizado com sucesso!")
         
         window.destroy(); # Fecha a janela de edição.
@@ -677,17 +1555,19 @@ class App(tk.Tk):
             rows_to_delete = []; 
             
             # Primeiro, coleta os números de todas as linhas a serem deletadas.
-            for item in selected_items:
-                item_id = int(self.tree.item(item, "values")[0]); 
+            for item_id in self._ids_selecionados(selected_items):
                 row_index = self._find_sheet_row_index_by_id(self.equip_df, item_id)
                 
                 if row_index: 
                     rows_to_delete.append(row_index)
                     
-            # Deleta as linhas em ordem decrescente.
-            # Isso é CRUCIAL para evitar que os índices das linhas mudem durante a exclusão.
-            for row_index in sorted(rows_to_delete, reverse=True): 
-                self.equip_sheet.delete_rows(row_index)
+            # Deleta todas as linhas em uma única requisição (batchUpdate com um deleteDimension por linha).
+            # As exclusões são aplicadas na ordem da lista, então a ordem decrescente continua
+            # CRUCIAL para evitar que os índices das linhas mudem durante a exclusão.
+            requests = [{'deleteDimension': {'range': {'sheetId': self.equip_sheet.id, 'dimension': 'ROWS', 'startIndex': row_index - 1, 'endIndex': row_index}}}
+                        for row_index in sorted(set(rows_to_delete), reverse=True)]
+            if requests: self.spreadsheet.batch_update({'requests': requests})
+            self._invalidar_cache()
                 
             messagebox.showinfo("Sucesso", f"{len(selected_items)} equipamento(s) excluído(s) com sucesso."); 
             
@@ -708,13 +1588,27 @@ class App(tk.Tk):
         if self.mov_df.empty or 'id_equipamento_fk' not in self.mov_df.columns: 
             return None
         
-        # Filtra todas as movimentações do tipo 'Saída' para o item específico.
-        movs_item = self.mov_df[(self.mov_df['id_equipamento_fk'] == item_id) & (self.mov_df['tipo_movimentacao'] == 'Saída')]
-        
-        if not movs_item.empty:
-            # Ordena pela ID da movimentação (mais recente) e pega a primeira linha.
-            last_mov = movs_item.sort_values(by="id_movimentacao", ascending=False).iloc[0]; return (last_mov['destino_origem'], last_mov['solicitante'])
-        return None
+        # Na primeira consulta após cada atualização, monta o mapa {id do item: (destino, solicitante)}
+        # da última saída de todos os itens de uma vez; as consultas seguintes são diretas.
+        if self._ultimas_saidas is None:
+            saidas = self.mov_df[(self.mov_df['tipo_movimentacao'] == 'Saída') & self.mov_df['id_equipamento_fk'].notna()]
+            
+            # Ordena pela ID da movimentação (mais recente primeiro) e fica com a primeira linha de cada item.
+            saidas = self._ordenar_por_id_desc(saidas, "id_movimentacao").drop_duplicates('id_equipamento_fk')
+            self._ultimas_saidas = dict(zip(saidas['id_equipamento_fk'].tolist(), zip(saidas['destino_origem'].tolist(), saidas['solicitante'].tolist())))
+        return self._ultimas_saidas.get(item_id)
+
+    def _nome_por_id(self):
+        """
+        Retorna o mapa {id: nome} dos equipamentos, montando-o na primeira chamada após cada atualização.
+
+        Returns:
+            dict: O nome de cada equipamento indexado pelo seu ID.
+        """
+        if self._nomes_por_id is None:
+            if self.equip_df.empty: self._nomes_por_id = {}
+            else: self._nomes_por_id = dict(zip(self.equip_df['id'].tolist(), self.equip_df['nome'].tolist()))
+        return self._nomes_por_id
     
     def abrir_janela_movimentacao(self):
         
@@ -873,7 +1767,7 @@ class App(tk.Tk):
                     self.extra_field_visible = False
         # Vincula os eventos às funções de controle da interface.           
         combo_origem_entrada.bind("<<ComboboxSelected>>", on_origem_selected); 
-        mov_type_var.trace("w", toggle_mov_type)
+        mov_type_var.trace_add("write", toggle_mov_type)
         
         # --- Cria a Lista de Itens a Movimentar ---
         items_frame = ttk.LabelFrame(main_content_frame, text="Itens a Movimentar", padding="20 10"); 
@@ -929,6 +1823,8 @@ class App(tk.Tk):
             window (tk.Toplevel): A janela de movimentação, para que possa ser fechada no final.
         """
         
+        if self._gravacao_em_andamento: return # A movimentação anterior ainda está sendo gravada.
+
         # --- Validação dos Campos Obrigatórios ---
         # Verifica se os campos essenciais para cada tipo de movimentação foram preenchidos.
         if not responsavel:
@@ -948,65 +1844,90 @@ class App(tk.Tk):
         
         for item_data, qtd_entry in movimentacao_details:
             nome_item, qtd_atual = item_data['nome'], item_data['quantidade']
-            try:
-                qtd_mov = int(qtd_entry.get())
-                if qtd_mov <= 0: 
-                    messagebox.showerror("Valor Inválido", f"A quantidade para '{nome_item}' deve ser maior que zero.", parent=window); 
-                    return
-                
-                # Validação crucial para saídas: não permitir que saia mais do que há em estoque.
-                if tipo_mov == 'Saída' and qtd_mov > qtd_atual: 
-                    messagebox.showerror("Estoque Insuficiente", f"Item '{nome_item}': A quantidade a mover ({qtd_mov}) excede o estoque ({qtd_atual}).", parent=window); 
-                    return
-                
-                 # Adiciona o item e sua quantidade a uma lista de itens prontos para serem processados.
-                items_validados.append({'data': item_data, 'qtd_a_mover': qtd_mov})
-            except ValueError: 
+            qtd_texto = qtd_entry.get()
+            if not _INT_RE.fullmatch(qtd_texto): 
                 messagebox.showerror("Valor Inválido", f"A quantidade para '{nome_item}' deve ser um número inteiro.", parent=window)
                 return
+            qtd_mov = int(qtd_texto)
+            if qtd_mov <= 0: 
+                messagebox.showerror("Valor Inválido", f"A quantidade para '{nome_item}' deve ser maior que zero.", parent=window); 
+                return
+            
+            # Validação crucial para saídas: não permitir que saia mais do que há em estoque.
+            if tipo_mov == 'Saída' and qtd_mov > qtd_atual: 
+                messagebox.showerror("Estoque Insuficiente", f"Item '{nome_item}': A quantidade a mover ({qtd_mov}) excede o estoque ({qtd_atual}).", parent=window); 
+                return
+            
+             # Adiciona o item e sua quantidade a uma lista de itens prontos para serem processados.
+            items_validados.append({'data': item_data, 'qtd_a_mover': qtd_mov})
             
         # --- Processamento e Atualização dos Dados na Planilha ---
         data_mov = datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
         novas_movimentacoes = [] # Lista para armazenar todos os registros de movimentação a serem adicionados.
-        
-        for item in items_validados:
-            item_id, qtd_atual = item['data']['id'], item['data']['quantidade']
-            qtd_a_mover = item['qtd_a_mover']
-            
-            # Calcula a nova quantidade em estoque com base no tipo de movimentação.
-            if tipo_mov == 'Saída': 
-                nova_qtd = qtd_atual - qtd_a_mover; 
-                novo_status = "Em Estoque" if nova_qtd > 0 else "Fora de Estoque"
-            elif tipo_mov == 'Entrada': 
-                nova_qtd = qtd_atual + qtd_a_mover; 
-                novo_status = "Em Estoque"
-            else: 
-                nova_qtd = 0; 
-                novo_status = "Descartado"
+        atualizacoes_estoque = [] # Novas quantidades/status, enviados em lote para a aba 'equipamentos'.
+        proximo_mov_id = self._get_next_id(self.mov_sheet, len(items_validados)) # Reserva um ID sequencial por item.
+        
+        # Calcula a nova quantidade em estoque e o novo status de todos os itens de uma vez,
+        # com arrays do NumPy, com base no tipo de movimentação.
+        qtds_atuais = np.array([item['data']['quantidade'] for item in items_validados], dtype='int64')
+        qtds_a_mover = np.array([item['qtd_a_mover'] for item in items_validados], dtype='int64')
+        if tipo_mov == 'Saída': 
+            novas_qtds = qtds_atuais - qtds_a_mover; 
+            novos_status = np.where(novas_qtds > 0, "Em Estoque", "Fora de Estoque")
+        elif tipo_mov == 'Entrada': 
+            novas_qtds = qtds_atuais + qtds_a_mover; 
+            novos_status = np.full(len(items_validados), "Em Estoque")
+        else: 
+            novas_qtds = np.zeros(len(items_validados), dtype='int64'); 
+            novos_status = np.full(len(items_validados), "Descartado")
+        
+        # Os campos que dependem só do tipo da movimentação (iguais para todos os itens) são definidos uma vez.
+        if tipo_mov == 'Descarte': solicitante_mov, chamado_mov, motivo_mov = '', '', motivo_laudo.strip()
+        else: solicitante_mov, chamado_mov, motivo_mov = solicitante, chamado, ''
+
+        # tolist() devolve int/str nativos do Python, que a API do Sheets consegue serializar.
+        for item, nova_qtd, novo_status in zip(items_validados, novas_qtds.tolist(), novos_status.tolist()):
+            item_id, qtd_a_mover = item['data']['id'], item['qtd_a_mover']
                 
             # Atualiza a quantidade e o status na aba 'equipamentos'.    
             row_index = self._find_sheet_row_index_by_id(self.equip_df, item_id)
             
             if row_index:
-                self.equip_sheet.update_cell(row_index, 5, nova_qtd) # Coluna 5 é 'quantidade'
-                self.equip_sheet.update_cell(row_index, 6, novo_status) # Coluna 6 é 'status'
+                # As colunas E ('quantidade') e F ('status') são vizinhas, então vão juntas em um só intervalo.
+                atualizacoes_estoque.append({'range': f'E{row_index}:F{row_index}', 'values': [[nova_qtd, novo_status]]})
                 
             # Prepara a nova linha para ser adicionada na aba 'movimentacoes'.   
-            mov_id = self._get_next_id(self.mov_sheet) + len(novas_movimentacoes)
+            mov_id = proximo_mov_id + len(novas_movimentacoes)
             novas_movimentacoes.append([
                 mov_id, item_id, tipo_mov, qtd_a_mover, destino_origem, 
-                solicitante if tipo_mov != 'Descarte' else '', chamado if tipo_mov != 'Descarte' else '',
-                responsavel, data_mov, 
-                motivo_laudo.strip() if tipo_mov == 'Descarte' else ''])
+                solicitante_mov, chamado_mov, responsavel, data_mov, motivo_mov])
         
         # --- Registro e Atualização Final ---
-        # Adiciona todas as novas movimentações à planilha de uma só vez.    
-        if novas_movimentacoes: 
-            self.mov_sheet.append_rows(novas_movimentacoes)
-            
-        messagebox.showinfo("Sucesso", "Movimentação registrada com sucesso!")
-        window.destroy() # Fecha a janela de movimentação. 
-        self.refresh_all_data() # Atualiza toda a interface.
+        # As escritas na planilha rodam em segundo plano para a janela não travar durante as requisições;
+        # as mensagens, o fechamento da janela e a atualização voltam para a thread da interface.
+        def gravar():
+            # Atualiza o estoque de todos os itens em uma única requisição (mesma interpretação do update_cell).
+            if atualizacoes_estoque:
+                self.equip_sheet.batch_update(atualizacoes_estoque, value_input_option='USER_ENTERED')
+            
+            # Adiciona todas as novas movimentações à planilha de uma só vez.    
+            if novas_movimentacoes: 
+                self.mov_sheet.append_rows(novas_movimentacoes)
+
+        def ao_concluir(_):
+            self._gravacao_em_andamento = False; self.config(cursor=""); self._invalidar_cache()
+            messagebox.showinfo("Sucesso", "Movimentação registrada com sucesso!")
+            window.destroy() # Fecha a janela de movimentação. 
+            # Atualiza toda a interface com a busca em segundo plano (ver refresh_with_feedback), sem travar a janela.
+            self.refresh_with_feedback()
+
+        def ao_falhar(erro):
+            # Parte das escritas pode ter sido feita, então a cópia local também é descartada.
+            self._gravacao_em_andamento = False; self.config(cursor=""); self._invalidar_cache()
+            messagebox.showerror("Erro ao Registrar", f"Não foi possível registrar a movimentação.\n\nErro: {erro}")
+
+        self._gravacao_em_andamento = True; self.config(cursor="watch")
+        self._executar_em_segundo_plano(gravar, ao_concluir, ao_falhar)
 
     def abrir_janela_historico(self, event=None):
         
@@ -1027,7 +1948,7 @@ class App(tk.Tk):
                 messagebox.showwarning("Nenhum Item Selecionado", "Selecione um ou mais equipamentos."); 
                 return
         # Obtém os IDs numéricos (da coluna 0) dos itens selecionados na tabela.   
-        ids_para_buscar = [int(self.tree.item(item_id, "values")[0]) for item_id in selected_items_ids]
+        ids_para_buscar = self._ids_selecionados(selected_items_ids)
         
         # --- Criação da Janela de Histórico ---
         hist_window = tk.Toplevel(self); hist_window.title(f"Histórico Consolidado"); hist_window.geometry("1150x500"); hist_window.transient(self); hist_window.grab_set()
@@ -1057,24 +1978,20 @@ class App(tk.Tk):
         if not self.mov_df.empty and 'id_equipamento_fk' in self.mov_df.columns:
             
             # Filtra o DataFrame de movimentações para pegar apenas os registros dos IDs selecionados.
-            historico_df = self.mov_df[self.mov_df['id_equipamento_fk'].isin(ids_para_buscar)]
+            historico_df = self.mov_df[self.mov_df['id_equipamento_fk'].isin(ids_para_buscar)].copy()
             
-            # Cria um mapeamento de ID para nome. Isso permite mostrar o nome de um item
-            # mesmo que ele já tenha sido excluído da planilha principal de equipamentos.
-            id_to_name = self.equip_df.set_index('id')['nome'].to_dict()
-            historico_df['nome_equipamento'] = historico_df['id_equipamento_fk'].map(id_to_name).fillna("Item Excluído")
+            # Usa o mapeamento de ID para nome (só sobre as linhas já filtradas). Isso permite mostrar
+            # o nome de um item mesmo que ele já tenha sido excluído da planilha principal de equipamentos.
+            historico_df['nome_equipamento'] = historico_df['id_equipamento_fk'].map(self._nome_por_id()).fillna("Item Excluído")
             
             # Ordena para mostrar as movimentações mais recentes primeiro.
-            historico_df = historico_df.sort_values(by="id_movimentacao", ascending=False)
-            
-            # Garante que a coluna 'motivo_laudo' exista e preenche valores nulos para evitar erros.
-            if 'motivo_laudo' not in historico_df.columns: historico_df['motivo_laudo'] = ''
-            historico_df['motivo_laudo'] = historico_df['motivo_laudo'].fillna('')
+            historico_df = self._ordenar_por_id_desc(historico_df, "id_movimentacao")
             
             df_display = historico_df[['data_movimentacao', 'nome_equipamento', 'tipo_movimentacao', 'quantidade_movida', 'responsavel_movimentacao', 'solicitante', 'chamado', 'destino_origem', 'motivo_laudo']]
             
             # Itera sobre o DataFrame filtrado e insere cada linha na tabela da janela.
-            for index, row in df_display.iterrows(): hist_tree.insert("", "end", values=list(row))
+            # itertuples(name=None) entrega tuplas simples, sem o custo de montar uma Series por linha.
+            for row in df_display.itertuples(index=False, name=None): hist_tree.insert("", "end", values=row)
 
     def abrir_janela_edicao(self):
         
@@ -1087,8 +2004,13 @@ class App(tk.Tk):
             return
         
         # --- Coleta dos Dados Atuais ---
-        item_id = int(self.tree.item(selected_items[0], "values")[0])
-        item_data = self.equip_df[self.equip_df['id'] == item_id].iloc[0]
+        item_id = next(iter(self._ids_selecionados(selected_items)))
+        # Localiza a linha pelo mapa {id: linha da planilha} montado em _apply_dataframes, sem comparar a coluna inteira.
+        row_index = self._equip_id_to_row.get(item_id)
+        if row_index is None: 
+            messagebox.showerror("Erro", "Equipamento não encontrado. Atualize os dados e tente novamente."); 
+            return
+        item_data = self.equip_df.iloc[row_index - 2]
         
         # --- Criação da Janela de Edição ---
         edit_window = tk.Toplevel(self); edit_window.title("Editar Equipamento"); edit_window.geometry("400x380"); edit_window.transient(self); edit_window.grab_set()
@@ -1116,6 +2038,73 @@ class App(tk.Tk):
         btn_salvar.pack(side="left", padx=10)
         btn_cancelar = ttk.Button(button_frame, text="Cancelar", command=edit_window.destroy); btn_cancelar.pack(side="left", padx=10)
 
+    def _linhas_html_mov_setores(self):
+        """
+        Retorna a linha <tr> do relatório de cada movimentação entre setores, montando todas na
+        primeira chamada após cada atualização dos dados e reaproveitando-as nos relatórios seguintes.
+
+        Os textos da planilha são escapados (ex: '<' vira '&lt;'), uma coluna por vez; nas colunas do "Kit",
+        a mesma passada já converte as quebras de linha (\\n) em tags HTML (<br>) para exibição correta.
+        Cada linha sai de operações vetorizadas sobre as colunas inteiras, em vez de célula a célula.
+
+        Returns:
+            pd.Series: O HTML de cada linha, alinhado com self.mov_setores_df.
+        """
+        if self._mov_setores_html is None: self._mov_setores_html = self._montar_html_mov_setores(self.mov_setores_df)
+        return self._mov_setores_html
+
+    @staticmethod
+    def _montar_html_mov_setores(df):
+        """
+        Monta a linha <tr> do relatório de cada movimentação do DataFrame (ver _linhas_html_mov_setores).
+
+        Args:
+            df (pd.DataFrame): As movimentações entre setores.
+
+        Returns:
+            pd.Series: O HTML de cada linha, alinhado com o DataFrame.
+        """
+        celulas = [df[col].astype(str).map(_escapar_com_quebras if col in ('patrimonio', 'servicetag') else html.escape)
+                   for col in COLUNAS_RELATORIO_SETORES]
+        linhas = "    <tr>\n      <td>" + celulas[0]
+        for coluna in celulas[1:]: linhas = linhas + "</td>\n      <td>" + coluna
+        return linhas + "</td>\n    </tr>\n"
+
+    def _configurar_placeholder_data(self, entries):
+        """
+        Preenche os campos de data com o placeholder e associa os eventos de foco que o limpam e o reinserem.
+        Os handlers são métodos da classe, em vez de funções recriadas a cada abertura de janela.
+
+        Args:
+            entries (list): Os campos ttk.Entry de data.
+        """
+        for entry in entries:
+            entry.insert(0, PLACEHOLDER_DATA); entry.config(foreground=COR_PLACEHOLDER)
+            entry.bind("<FocusIn>", self._limpar_placeholder_data); entry.bind("<FocusOut>", self._restaurar_placeholder_data)
+
+    def _limpar_placeholder_data(self, event):
+        """Quando o campo de data ganha foco, limpa o texto do placeholder."""
+        widget = event.widget
+        if widget.get() == PLACEHOLDER_DATA: widget.delete(0, tk.END); widget.config(foreground=self._cor_texto_padrao)
+
+    def _restaurar_placeholder_data(self, event):
+        """Quando o campo de data perde o foco, se estiver vazio, reinsere o placeholder."""
+        widget = event.widget
+        if not widget.get(): widget.insert(0, PLACEHOLDER_DATA); widget.config(foreground=COR_PLACEHOLDER)
+
+    def _ids_selecionados(self, item_ids):
+        """
+        Lê o ID (coluna 0) de cada linha selecionada na tabela de equipamentos.
+
+        Args:
+            item_ids (iterable): Os identificadores das linhas na Treeview.
+
+        Returns:
+            set: Os IDs numéricos dos equipamentos; o set pode ser passado direto ao isin().
+        """
+        # tree.set(iid, coluna) busca só a célula do ID, sem montar a tupla com todos os valores da linha.
+        return {int(self.tree.set(item_id, "ID")) for item_id in item_ids}
+
     def get_data_from_tree_selection(self, selected_item_ids):
         
         """
@@ -1125,7 +2114,7 @@ class App(tk.Tk):
         if not selected_item_ids: return []
         
         # Extrai os IDs numéricos (da coluna 0) dos itens selecionados.
-        tree_ids = [int(self.tree.item(item_id, "values")[0]) for item_id in selected_item_ids]
+        tree_ids = self._ids_selecionados(selected_item_ids)
         
         # Filtra o DataFrame principal e retorna as linhas correspondentes como uma lista de dicionários.
         selected_data = self.equip_df[self.equip_df['id'].isin(tree_ids)].to_dict('records')
@@ -1145,30 +2134,6 @@ class App(tk.Tk):
         opts_frame = ttk.Frame(opts_window, padding="20")
         opts_frame.pack(expand=True, fill="both")
 
-        # --- Lógica para Simular Placeholder nos Campos de Data ---
-        # Melhora a experiência do usuário, mostrando o formato esperado (dd/mm/aaaa).
-        placeholder_text = "dd/mm/aaaa"
-        placeholder_color = "grey"
-        default_fg_color = self.entry_nome.cget("foreground")
-
-        def on_focus_in(event):
-            
-            """Quando o campo de data ganha foco, limpa o texto do placeholder."""
-            
-            widget = event.widget
-            if widget.get() == placeholder_text:
-                widget.delete(0, tk.END)
-                widget.config(foreground=default_fg_color)
-
-        def on_focus_out(event):
-            
-            """Quando o campo de data perde o foco, se estiver vazio, reinsere o placeholder."""
-            
-            widget = event.widget
-            if not widget.get():
-                widget.insert(0, placeholder_text)
-                widget.config(foreground=placeholder_color)
-
         opts_frame.grid_columnconfigure(0, weight=1) # Faz a coluna expandir e centralizar
 
         # Checkbox principal
@@ -1182,13 +2147,13 @@ class App(tk.Tk):
         
         filtro_data_var = tk.StringVar(value="todos")
         rb_todos = ttk.Radiobutton(date_filter_frame, text="Todo o período", variable=filtro_data_var, value="todos")
-        rb_todos.pack(anchor="w")
+        rb_todos.grid(row=0, column=0, sticky="w")
         rb_intervalo = ttk.Radiobutton(date_filter_frame, text="Intervalo de datas específico:", variable=filtro_data_var, value="intervalo")
-        rb_intervalo.pack(anchor="w", pady=(5,0))
+        rb_intervalo.grid(row=1, column=0, sticky="w", pady=(5,0))
 
-        # Campos de data
+        # Campos de data (posicionados com grid, para que grid_remove() os esconda guardando a posição)
         datas_frame = ttk.Frame(date_filter_frame)
-        datas_frame.pack(pady=5, padx=20)
+        datas_frame.grid(row=2, column=0, pady=5, padx=20)
         
         ttk.Label(datas_frame, text="De:").pack(side="left")
         entry_inicio = ttk.Entry(datas_frame, width=15, justify="center")
@@ -1198,12 +2163,8 @@ class App(tk.Tk):
         entry_fim = ttk.Entry(datas_frame, width=15, justify="center")
         entry_fim.pack(side="left", padx=5)
 
-        # Configurando o placeholder para os campos de data
-        for entry in [entry_inicio, entry_fim]:
-            entry.insert(0, placeholder_text)
-            entry.config(foreground=placeholder_color)
-            entry.bind("<FocusIn>", on_focus_in)
-            entry.bind("<FocusOut>", on_focus_out)
+        # Configurando o placeholder (dd/mm/aaaa) para os campos de data
+        self._configurar_placeholder_data([entry_inicio, entry_fim])
 
         def toggle_date_filter_visibility(*args):
             if incluir_historico_var.get():
@@ -1212,13 +2173,14 @@ class App(tk.Tk):
                 date_filter_frame.grid_remove()
 
         def toggle_date_entries_visibility(*args):
+            # grid() reexibe o frame com as opções guardadas pelo grid_remove(), sem precisar repassá-las.
             if filtro_data_var.get() == "intervalo":
-                datas_frame.pack(pady=5, padx=20)
+                datas_frame.grid()
             else:
-                datas_frame.pack_forget()
+                datas_frame.grid_remove()
 
-        incluir_historico_var.trace("w", toggle_date_filter_visibility)
-        filtro_data_var.trace("w", toggle_date_entries_visibility)
+        incluir_historico_var.trace_add("write", toggle_date_filter_visibility)
+        filtro_data_var.trace_add("write", toggle_date_entries_visibility)
         
         toggle_date_filter_visibility()
         toggle_date_entries_visibility()
@@ -1229,11 +2191,11 @@ class App(tk.Tk):
             filtro_data = filtro_data_var.get()
             
             data_inicio = entry_inicio.get()
-            if data_inicio == placeholder_text:
+            if data_inicio == PLACEHOLDER_DATA:
                 data_inicio = ""
 
             data_fim = entry_fim.get()
-            if data_fim == placeholder_text:
+            if data_fim == PLACEHOLDER_DATA:
                 data_fim = ""
             
             # Depois, fecha a janela
@@ -1256,13 +2218,13 @@ class App(tk.Tk):
             data_inicio_str (str): Data de início do filtro (formato dd/mm/aaaa).
             data_fim_str (str): Data de fim do filtro (formato dd/mm/aaaa).
         """
-        # Pega os IDs dos itens que estão atualmente visíveis na tabela (Treeview).
-        visible_items_tree_ids = self.tree.get_children()
-        if not visible_items_tree_ids:
+        # Pega os IDs dos itens listados na tabela (Treeview), isto é, todos os que passaram pelo filtro,
+        # inclusive os que ainda não foram inseridos por não terem sido alcançados pela rolagem.
+        if not self._equip_linhas:
             messagebox.showinfo("Relatório Vazio", "Não há itens na lista para gerar um relatório."); return
 
         # Filtra o DataFrame principal para conter apenas os itens visíveis.
-        visible_ids = [int(self.tree.item(item_id, "values")[0]) for item_id in visible_items_tree_ids]
+        visible_ids = [int(row[0]) for row in self._equip_linhas]
         df_relatorio = self.equip_df[self.equip_df['id'].isin(visible_ids)]
 
         # Abre uma janela para o usuário escolher onde salvar o arquivo.
@@ -1277,88 +2239,92 @@ class App(tk.Tk):
             try:
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 template_path = os.path.join(script_dir, 'relatorio_template.html')
-                with open(template_path, 'r', encoding='utf-8') as f: template_html = f.read()
+                template_partes = self._carregar_template(template_path)
             except FileNotFoundError:
                 
                 # Se o template não for encontrado, usa um HTML básico como fallback.
                 messagebox.showinfo("Template não encontrado", "Arquivo 'relatorio_template.html' não encontrado. Usando layout básico.")
-                template_html = """
+                template_partes = _dividir_template("""
                 <!DOCTYPE html><html lang="pt-br"><head><meta charset="UTF-8"><title>Relatório de Estoque</title>
                 <style>body{font-family:sans-serif;} h1{color:#007bff;} .header{border-bottom:1px solid #ccc;padding-bottom:10px;} table{border-collapse:collapse;width:100%;margin-top:15px;} th,td{border:1px solid #ddd;padding:8px;} th{background-color:#f2f2f2;}</style>
                 </head><body><div class="header"><h1>Relatório de Estoque</h1><p><strong>Gerado em:</strong> {{data_geracao}}</p><p><strong>Total de Tipos de Itens no Relatório:</strong> {{total_itens}}</p></div><hr>{{conteudo_relatorio}}</body></html>
-                """
+                """)
 
             # --- Processamento dos Filtros de Data ---
-            data_inicio_dt, data_fim_dt = None, None
+            inicio_ns, fim_ns = None, None
             if incluir_historico and filtro_data == 'intervalo':
                 try:
-                    data_inicio_dt = pd.to_datetime(data_inicio_str, format='%d/%m/%Y')
-                    
-                    # Adiciona 1 dia e subtrai 1 segundo para incluir o dia final inteiro no intervalo.
-                    data_fim_dt = pd.to_datetime(data_fim_str, format='%d/%m/%Y') + pd.Timedelta(days=1, seconds=-1)
+                    # Limites em nanossegundos; o dia final entra inteiro no intervalo.
+                    inicio_ns, fim_ns = _intervalo_datas_ns(data_inicio_str, data_fim_str)
                 except ValueError:
                     messagebox.showerror("Data Inválida", "Formato de data inválido. Use dd/mm/aaaa."); return
 
             # --- Construção do Conteúdo HTML Dinâmico ---
-            conteudo_dinamico = ""
-            for index, item in df_relatorio.iterrows():
-                # Adiciona as informações básicas do item.
-                conteudo_dinamico += "<div class='item-section'>"
-                conteudo_dinamico += f"<h2>{item['nome']} (ID: {item['id']})</h2>"
-                conteudo_dinamico += "<div class='item-details-grid'>"
-                conteudo_dinamico += f"<p><strong>Categoria:</strong> {item.get('categoria', 'N/A')}</p>"
-                conteudo_dinamico += f"<p><strong>Status:</strong> {item['status']}</p>"
-                conteudo_dinamico += f"<p><strong>Quantidade Atual:</strong> {item['quantidade']}</p>"
-                conteudo_dinamico += f"<p><strong>Estoque Mínimo:</strong> {item['estoque_minimo']}</p>"
-                conteudo_dinamico += f"<p><strong>Nº de Série/SKU:</strong> {item.get('numero_serie', '')}</p>"
-                conteudo_dinamico += f"<p><strong>Descrição:</strong> {item.get('descricao', '')}</p>"
-                conteudo_dinamico += "</div>"
-
-                # Se a opção foi marcada, busca e adiciona o histórico do item.
-                if incluir_historico:
-                    hist_df = self.mov_df[self.mov_df['id_equipamento_fk'] == item['id']]
-                    
-                    # Aplica o filtro de data, se necessário.
-                    if filtro_data == 'intervalo' and not hist_df.empty:
-                        hist_df = hist_df[(hist_df['data_movimentacao_dt'] >= data_inicio_dt) & (hist_df['data_movimentacao_dt'] <= data_fim_dt)]
-
-                     # Se houver histórico, cria uma tabela HTML para ele.
-                    if not hist_df.empty:
-                        hist_df_sorted = hist_df.sort_values(by='id_movimentacao', ascending=False)
-                        conteudo_dinamico += "<h3>Histórico de Movimentações:</h3>"
-                        
-                                        
-                        conteudo_dinamico += "<table><thead><tr><th>Data</th><th>Tipo</th><th>Qtd</th><th>Responsável</th><th>Solicitante</th><th>Destino/Origem</th><th>Chamado</th><th>Motivo/Laudo</th></tr></thead><tbody>"
-                        for h_index, mov in hist_df_sorted.iterrows():
-                            conteudo_dinamico += "<tr>"
-                            conteudo_dinamico += f"<td>{mov.get('data_movimentacao', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('tipo_movimentacao', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('quantidade_movida', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('responsavel_movimentacao', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('solicitante', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('destino_origem', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('chamado', '')}</td>"
-                            conteudo_dinamico += f"<td>{mov.get('motivo_laudo', '')}</td>"
-                            conteudo_dinamico += "</tr>"
-                        conteudo_dinamico += "</tbody></table>"
+            # O histórico de todos os itens do relatório é filtrado (itens e datas) e ordenado uma única
+            # vez, em vez de varrer o DataFrame de movimentações inteiro para cada item.
+            # Em seguida monta, com operações vetorizadas do Pandas sobre as colunas inteiras, a linha
+            # <tr> de cada movimentação e agrupa essas linhas por equipamento.
+            historico_por_item = {}
+            if incluir_historico and 'id_equipamento_fk' in self.mov_df.columns:
+                mascara = self.mov_df['id_equipamento_fk'].isin(visible_ids).to_numpy()
+                # O filtro de data compara as datas já guardadas como int64 (nanossegundos, ver _apply_dataframes)
+                # com os limites do intervalo, direto no NumPy; datas inválidas ficam de fora.
+                if filtro_data == 'intervalo':
+                    mascara = mascara & (self._mov_datas_ns >= inicio_ns) & (self._mov_datas_ns <= fim_ns)
+                mov_relatorio = self.mov_df[mascara]
+                mov_relatorio = self._ordenar_por_id_desc(mov_relatorio, 'id_movimentacao')
+                # Os textos vêm da planilha e são escapados (ex: '<' vira '&lt;') para não quebrar o HTML.
+                colunas_hist = mov_relatorio.reindex(columns=COLUNAS_HISTORICO_RELATORIO, fill_value='').fillna('').astype(str).map(html.escape)
+                linhas_hist = "<tr><td>" + colunas_hist[COLUNAS_HISTORICO_RELATORIO[0]]
+                for col in COLUNAS_HISTORICO_RELATORIO[1:]: linhas_hist = linhas_hist + "</td><td>" + colunas_hist[col]
+                linhas_hist = linhas_hist + "</td></tr>"
+                historico_por_item = {id_item: grupo.tolist() for id_item, grupo in linhas_hist.groupby(mov_relatorio['id_equipamento_fk'], sort=False)}
+
+            # Os trechos do conteúdo são produzidos por um gerador, item a item, e gravados no arquivo à medida
+            # que são gerados (ver _gravar_template): o HTML do relatório nunca fica inteiro na memória.
+            # itertuples evita criar uma Series por linha (como o iterrows faz); as colunas
+            # opcionais continuam com o mesmo valor padrão de antes via getattr.
+            # Os campos de texto digitados pelo usuário passam por 'esc' (html.escape) antes de entrar no HTML.
+            esc = html.escape
+
+            def html_itens():
+                for item in df_relatorio.itertuples(index=False):
+                    # Adiciona as informações básicas do item.
+                    yield "<div class='item-section'>"
+                    yield f"<h2>{esc(str(item.nome))} (ID: {item.id})</h2>"
+                    yield "<div class='item-details-grid'>"
+                    yield f"<p><strong>Categoria:</strong> {esc(str(getattr(item, 'categoria', 'N/A')))}</p>"
+                    yield f"<p><strong>Status:</strong> {esc(str(item.status))}</p>"
+                    yield f"<p><strong>Quantidade Atual:</strong> {item.quantidade}</p>"
+                    yield f"<p><strong>Estoque Mínimo:</strong> {item.estoque_minimo}</p>"
+                    yield f"<p><strong>Nº de Série/SKU:</strong> {esc(str(getattr(item, 'numero_serie', '')))}</p>"
+                    yield f"<p><strong>Descrição:</strong> {esc(str(getattr(item, 'descricao', '')))}</p>"
+                    yield "</div>"
+
+                    # Se a opção foi marcada e o item tem movimentações (após o filtro de data), cria uma tabela HTML para elas.
+                    linhas_item = historico_por_item.get(item.id)
+                    if linhas_item:
+                        yield "<h3>Histórico de Movimentações:</h3>"
+                        yield "<table><thead><tr><th>Data</th><th>Tipo</th><th>Qtd</th><th>Responsável</th><th>Solicitante</th><th>Destino/Origem</th><th>Chamado</th><th>Motivo/Laudo</th></tr></thead><tbody>"
+                        yield from linhas_item
+                        yield "</tbody></table>"
                 
-                conteudo_dinamico += "</div>" # Fim do .item-section
+                    yield "</div>" # Fim do .item-section
             
-            # --- Montagem do HTML Final ---
-            # Substitui os placeholders (ex: {{data_geracao}}) no template pelos valores reais.
-            final_html = template_html.replace('{{data_geracao}}', datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
-            final_html = final_html.replace('{{total_itens}}', str(len(df_relatorio)))
-            final_html = final_html.replace('{{conteudo_relatorio}}', conteudo_dinamico)
-            
-            # Escreve o HTML final no arquivo escolhido pelo usuário.
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(final_html)
+            # --- Montagem e Gravação do HTML Final ---
+            # Substitui os placeholders (ex: {{data_geracao}}) no template pelos valores reais, numa única passada,
+            # escrevendo direto no arquivo escolhido pelo usuário; os trechos do conteúdo vão para o
+            # arquivo conforme o gerador os produz, sem serem unidos antes em uma única string.
+            self._gravar_template(filepath, template_partes, {
+                'data_geracao': datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+                'total_itens': str(len(df_relatorio)),
+                'conteudo_relatorio': html_itens()})
             
             messagebox.showinfo("Sucesso", f"Relatório salvo com sucesso em:\n{filepath}")
             
             # Pergunta se o usuário deseja abrir o arquivo gerado no navegador.
             if messagebox.askyesno("Abrir Relatório", "Deseja abrir o relatório agora no seu navegador?"):
-                webbrowser.open(f"file://{os.path.realpath(filepath)}")
+                webbrowser.open(pathlib.Path(filepath).resolve().as_uri()) # URI file:/// válida também no Windows.
 
         except Exception as e:
             messagebox.showerror("Erro ao Gerar Relatório", f"Não foi possível gerar o arquivo.\n\nErro: {e}")
@@ -1380,35 +2346,33 @@ class App(tk.Tk):
             messagebox.showinfo("Relatório Vazio", "Não há movimentações para gerar um relatório.")
             return
 
-        df_relatorio = self.mov_setores_df.copy()
+        # Os filtros de status e de data montam uma única máscara sobre o DataFrame completo,
+        # usada no final para escolher as linhas da tabela, sem copiar o DataFrame.
+        df_completo = self.mov_setores_df
 
         # --- Filtro por Status ---
-        # Garante que a coluna de status exista e preenche valores vazios com 'Pendente'.
-        if 'status_regularizacao' not in df_relatorio.columns:
-            df_relatorio['status_regularizacao'] = 'Pendente'
-        df_relatorio['status_regularizacao'] = df_relatorio['status_regularizacao'].fillna('Pendente') 
+        # A coluna de status sempre existe: sem ela na planilha, a carga dos dados a cria como 'Pendente'.
+        status = df_completo['status_regularizacao']
         
         # Aplica o filtro com base na escolha do usuário.
         if filtro_status == 'pendentes':
-            df_relatorio = df_relatorio[df_relatorio['status_regularizacao'] == 'Pendente']
+            mascara = (status == 'Pendente').to_numpy()
         elif filtro_status == 'regularizados':
-            df_relatorio = df_relatorio[df_relatorio['status_regularizacao'] == 'Regularizado']
+            mascara = (status == 'Regularizado').to_numpy()
+        else:
+            mascara = np.ones(len(df_completo), dtype=bool)
         
         # --- Filtro por Data ---
-        # Aplica o filtro de data no DataFrame que já pode ter sido filtrado por status.
         if filtro_data == 'intervalo':
             try:
-                if 'data_movimentacao_dt' not in df_relatorio.columns:
-                     df_relatorio['data_movimentacao_dt'] = pd.to_datetime(df_relatorio['data_movimentacao'], format='%d-%m-%Y %H:%M:%S', errors='coerce')
-                
-                # Converte as strings de data para o formato datetime para permitir a comparação.
-                data_inicio_dt = pd.to_datetime(data_inicio_str, format='%d/%m/%Y')
-                data_fim_dt = pd.to_datetime(data_fim_str, format='%d/%m/%Y') + pd.Timedelta(days=1, seconds=-1)
+                # A coluna 'data_movimentacao_dt' já vem convertida da carga dos dados (_apply_dataframes),
+                # então o relatório não precisa interpretar as datas em texto de novo.
+                # Converte as strings de data direto nos limites int64 (nanossegundos) usados na comparação.
+                inicio_ns, fim_ns = _intervalo_datas_ns(data_inicio_str, data_fim_str)
                 
-                df_relatorio = df_relatorio[
-                    (df_relatorio['data_movimentacao_dt'] >= data_inicio_dt) & 
-                    (df_relatorio['data_movimentacao_dt'] <= data_fim_dt)
-                ]
+                # Compara as datas já guardadas como int64 (nanossegundos) com os limites do intervalo, direto no NumPy.
+                datas_ns = self._mov_setores_datas_ns
+                mascara = mascara & (datas_ns >= inicio_ns) & (datas_ns <= fim_ns)
             except (ValueError, TypeError):
                 messagebox.showerror("Data Inválida", "Formato de data inválido. Use dd/mm/aaaa.")
                 return
@@ -1416,7 +2380,7 @@ class App(tk.Tk):
                 messagebox.showerror("Erro no Filtro", f"Ocorreu um erro ao filtrar as datas: {e}")
                 return
 
-        if df_relatorio.empty:
+        if not mascara.any():
             messagebox.showinfo("Relatório Vazio", "Nenhuma movimentação encontrada para os filtros selecionados.")
             return
 
@@ -1430,36 +2394,24 @@ class App(tk.Tk):
 
         try:
             # --- Carregamento do Template e Preparação dos Dados ---
-            template_path = self.resource_path('relatorio_setores_template.html')
-            with open(template_path, 'r', encoding='utf-8') as f: template_html = f.read()
-            
-            # Garante que todas as colunas necessárias existam no DataFrame para evitar erros.
-            for col in ['chamado', 'solicitante', 'status_regularizacao']:
-                if col not in df_relatorio.columns: df_relatorio[col] = ''
-            df_relatorio = df_relatorio.fillna('')
-
-            # Renomeia as colunas para nomes mais amigáveis no relatório.
-            colunas_para_exibir = {'data_movimentacao': 'Data', 'tipo_equipamento': 'Equipamento', 'patrimonio': 'Patrimônio', 'servicetag': 'ServiceTag', 'setor_origem': 'Origem', 'setor_destino': 'Destino', 'responsavel': 'Responsável', 'chamado': 'Chamado', 'solicitante': 'Solicitante', 'status_regularizacao': 'Status', 'observacao': 'Observação'}
-            df_relatorio_display = df_relatorio.rename(columns=colunas_para_exibir)
-            df_relatorio_display = df_relatorio_display[list(colunas_para_exibir.values())] # Garante a ordem
-            
-            #Converte quebras de linha (\n) em tags HTML (<br>) para exibição correta dos dados do "Kit".
-            df_relatorio_display['Patrimônio'] = df_relatorio_display['Patrimônio'].str.replace('\n', '<br>')
-            df_relatorio_display['ServiceTag'] = df_relatorio_display['ServiceTag'].str.replace('\n', '<br>')
+            template_partes = self._carregar_template(self.resource_path('relatorio_setores_template.html'))
 
             # --- Geração da Tabela HTML ---
-            # Usa a função to_html do Pandas para converter o DataFrame em uma tabela HTML.
-            tabela_html = df_relatorio_display.to_html(index=False, justify='left', border=0, classes="styled-table", escape=False)
+            # A tabela é montada diretamente, com o mesmo HTML que o to_html do Pandas gerava. As linhas <tr>
+            # de todas as movimentações ficam guardadas entre um relatório e outro (ver _linhas_html_mov_setores),
+            # então trocar os filtros e gerar de novo só seleciona as linhas já prontas.
+            cabecalho = "".join(f"      <th>{nome}</th>\n" for nome in COLUNAS_RELATORIO_SETORES.values())
+            tabela_html = ['<table class="dataframe styled-table">\n  <thead>\n    <tr style="text-align: left;">\n', cabecalho,
+                           '    </tr>\n  </thead>\n  <tbody>\n', *self._linhas_html_mov_setores()[mascara].tolist(), '  </tbody>\n</table>']
             
             # --- Montagem e Salvamento do Arquivo Final ---
-            final_html = template_html.replace('{{data_geracao}}', datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'))
-            final_html = final_html.replace('{{tabela_movimentacoes}}', tabela_html)
-            
-            with open(filepath, 'w', encoding='utf-8') as f: f.write(final_html)
+            self._gravar_template(filepath, template_partes, {
+                'data_geracao': datetime.datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+                'tabela_movimentacoes': tabela_html})
             
             messagebox.showinfo("Sucesso", f"Relatório salvo com sucesso em:\n{filepath}")
             if messagebox.askyesno("Abrir Relatório", "Deseja abrir o relatório agora no seu navegador?"):
-                webbrowser.open(f"file://{os.path.realpath(filepath)}")
+                webbrowser.open(pathlib.Path(filepath).resolve().as_uri()) # URI file:/// válida também no Windows.
         except Exception as e:
             messagebox.showerror("Erro ao Gerar Relatório", f"Não foi possível gerar o arquivo.\n\nErro: {e}")
 
@@ -1492,39 +2444,30 @@ class App(tk.Tk):
         date_filter_frame = ttk.LabelFrame(opts_frame, text="Filtrar por Data", padding=10)
         date_filter_frame.grid(row=1, column=0, sticky="ew")
 
-        # Lógica de placeholder para os campos de data.
-        placeholder_text = "dd/mm/aaaa"; placeholder_color = "grey"; default_fg_color = self.entry_nome.cget("foreground")
-        def on_focus_in(event):
-            widget = event.widget
-            if widget.get() == placeholder_text: widget.delete(0, tk.END); widget.config(foreground=default_fg_color)
-        def on_focus_out(event):
-            widget = event.widget
-            if not widget.get(): widget.insert(0, placeholder_text); widget.config(foreground=placeholder_color)
-
         filtro_data_var = tk.StringVar(value="todos")
         rb_todos = ttk.Radiobutton(date_filter_frame, text="Todo o período", variable=filtro_data_var, value="todos")
-        rb_todos.pack(anchor="w")
+        rb_todos.grid(row=0, column=0, sticky="w")
         rb_intervalo = ttk.Radiobutton(date_filter_frame, text="Intervalo de datas específico:", variable=filtro_data_var, value="intervalo")
-        rb_intervalo.pack(anchor="w", pady=(5,0))
+        rb_intervalo.grid(row=1, column=0, sticky="w", pady=(5,0))
         datas_frame = ttk.Frame(date_filter_frame)
-        datas_frame.pack(pady=5, padx=20)
+        datas_frame.grid(row=2, column=0, pady=5, padx=20)
         
         ttk.Label(datas_frame, text="De:").pack(side="left"); entry_inicio = ttk.Entry(datas_frame, width=15, justify="center"); entry_inicio.pack(side="left", padx=5)
         ttk.Label(datas_frame, text="Até:").pack(side="left", padx=(10,0)); entry_fim = ttk.Entry(datas_frame, width=15, justify="center"); entry_fim.pack(side="left", padx=5)
 
-        for entry in [entry_inicio, entry_fim]:
-            entry.insert(0, placeholder_text); entry.config(foreground=placeholder_color); entry.bind("<FocusIn>", on_focus_in); entry.bind("<FocusOut>", on_focus_out)
+        self._configurar_placeholder_data([entry_inicio, entry_fim])
 
         # --- Lógica de Visibilidade Dinâmica ---
         def toggle_date_entries_visibility(*args):
             
             """Mostra ou esconde os campos de entrada de data."""
             
-            if filtro_data_var.get() == "intervalo": datas_frame.pack(pady=5, padx=20)
-            else: datas_frame.pack_forget()
+            # grid_remove() guarda as opções de posicionamento, e grid() reexibe o frame com elas.
+            if filtro_data_var.get() == "intervalo": datas_frame.grid()
+            else: datas_frame.grid_remove()
         
         # Associa a função de toggle à variável do radio button.
-        filtro_data_var.trace("w", toggle_date_entries_visibility); toggle_date_entries_visibility()
+        filtro_data_var.trace_add("write", toggle_date_entries_visibility); toggle_date_entries_visibility()
 
         def on_gerar_click():
             
@@ -1533,9 +2476,9 @@ class App(tk.Tk):
             filtro_status = filtro_status_var.get()
             filtro_data = filtro_data_var.get()
             data_inicio = entry_inicio.get()
-            if data_inicio == placeholder_text: data_inicio = ""
+            if data_inicio == PLACEHOLDER_DATA: data_inicio = ""
             data_fim = entry_fim.get()
-            if data_fim == placeholder_text: data_fim = ""
+            if data_fim == PLACEHOLDER_DATA: data_fim = ""
             opts_window.destroy()
             self.gerar_relatorio_setores(filtro_status, filtro_data, data_inicio, data_fim)
 
@@ -1546,22 +2489,28 @@ class App(tk.Tk):
         
         """Marca uma ou mais movimentações selecionadas como 'Regularizado' na planilha."""
         
+        if self._gravacao_em_andamento: return # Uma gravação anterior ainda está em andamento.
+
         selected_items_ids = self.mov_setores_tree.selection()
         if not selected_items_ids:
             messagebox.showwarning("Nenhum Item Selecionado", "Selecione uma ou mais movimentações pendentes para marcar como regularizadas.")
             return
 
-        updates = [] # Lista para armazenar as atualizações a serem enviadas em lote.
-        
-        for item_id_widget in selected_items_ids:
-            item_values = self.mov_setores_tree.item(item_id_widget, "values")
-            mov_id = int(item_values[0])
-
-            row_index = self._find_sheet_row_index_by_id(self.mov_setores_df, mov_id)
-            if row_index:
-                # Monta um dicionário de atualização para a célula correta.
-                # 'L' é a 12ª letra, correspondente à coluna 'status_regularizacao'.
-                updates.append({'range': f'L{row_index}', 'values': [['Regularizado']]})
+        # Linhas da planilha a serem marcadas (sem repetições). Cada seleção lê só a célula do ID
+        # (tree.set) e consulta direto o mapa {id: linha} montado em _apply_dataframes.
+        linhas_selecionadas = [self._mov_setores_id_to_row.get(int(self.mov_setores_tree.set(item_id_widget, "ID"))) for item_id_widget in selected_items_ids]
+        # Seleções cujo ID não está mais na planilha (ex: removidas por outro usuário); entram no resumo final.
+        nao_encontradas = linhas_selecionadas.count(None)
+        linhas = set(linhas_selecionadas); linhas.discard(None)
+
+        # Monta as atualizações a serem enviadas em lote, juntando linhas consecutivas em um único
+        # intervalo (ex: L5:L9), para que a API receba poucos intervalos mesmo com muitas linhas selecionadas.
+        # 'L' é a 12ª letra, correspondente à coluna 'status_regularizacao'.
+        # Em uma sequência de linhas consecutivas, a diferença (linha - posição) é a mesma.
+        updates = []
+        for _, grupo in itertools.groupby(enumerate(sorted(linhas)), key=lambda par: par[1] - par[0]):
+            bloco = [linha for _, linha in grupo]
+            updates.append({'range': f'L{bloco[0]}:L{bloco[-1]}', 'values': [['Regularizado']] * len(bloco)})
 
         if not updates:
             messagebox.showerror("Erro", "Não foi possível encontrar os registros selecionados para atualizar.")
@@ -1569,9 +2518,23 @@ class App(tk.Tk):
 
         # Envia todas as atualizações de uma só vez para a API do Google Sheets.
         # Isso é muito mais rápido e eficiente do que atualizar uma célula de cada vez.
-        self.mov_setores_sheet.batch_update(updates)
-        messagebox.showinfo("Sucesso", f"{len(updates)} movimentação(ões) marcada(s) como 'Regularizado'.")
-        self.refresh_all_data()
+        # A requisição roda em segundo plano para a janela não travar; a mensagem e a atualização
+        # voltam para a thread da interface. O resultado do lote inteiro é mostrado em um único aviso.
+        def ao_concluir(_):
+            self._gravacao_em_andamento = False; self.config(cursor=""); self._invalidar_cache()
+            resumo = f"{len(linhas)} movimentação(ões) marcada(s) como 'Regularizado'."
+            if nao_encontradas:
+                resumo += f"\n{nao_encontradas} movimentação(ões) não encontrada(s) na planilha; atualize os dados e tente novamente."
+                messagebox.showwarning("Resultado", resumo)
+            else: messagebox.showinfo("Sucesso", resumo)
+            self.refresh_with_feedback() # A nova leitura da planilha também é feita em segundo plano.
+
+        def ao_falhar(erro):
+            self._gravacao_em_andamento = False; self.config(cursor=""); self._invalidar_cache()
+            messagebox.showerror("Erro ao Atualizar", f"Não foi possível marcar as movimentações.\n\nErro: {erro}")
+
+        self._gravacao_em_andamento = True; self.config(cursor="watch")
+        self._executar_em_segundo_plano(lambda: self.mov_setores_sheet.batch_update(updates), ao_concluir, ao_falhar)
 
 if __name__ == "__main__":
     app = App()